@@ -0,0 +1,422 @@
+import dbus
+
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from libraries.bluetooth import constants
+
+
+def get_device_path_of(path):
+    """Return the Device1 object path that owns the given BlueZ object path.
+
+    Args:
+        path: Any BlueZ object path (device, media player, transport, ...).
+
+    Returns:
+        The device path (e.g. /org/bluez/hci0/dev_XX_XX_XX_XX_XX_XX), or None
+        if the path does not belong to a device.
+    """
+    parts = str(path).split("/")
+    for index, part in enumerate(parts):
+        if part.startswith("dev_"):
+            return "/".join(parts[:index + 1])
+    return None
+
+
+class BluezObjectCache:
+    """Local mirror of the BlueZ object tree kept current from ObjectManager signals.
+
+    The tree is loaded once with GetManagedObjects and then updated from
+    InterfacesAdded, InterfacesRemoved and PropertiesChanged, so lookups by
+    adapter, address and interface are answered without a bus round trip.
+    Signals are only delivered while a GLib loop dispatches them; when
+    is_dispatching reports that none does, every lookup reloads the tree
+    instead. The tree is also reloaded whenever bluetoothd (re)claims org.bluez.
+    """
+
+    def __init__(self, bus, log=None, is_dispatching=None):
+        """Initialize an empty cache bound to the given bus.
+
+        Args:
+            bus: D-Bus connection where org.bluez lives (normally the system bus).
+            log: Logger instance.
+            is_dispatching: Callable returning True while a GLib loop dispatches
+                signals; None assumes one always does.
+        """
+        self.bus = bus
+        self.log = log
+        self.is_dispatching = is_dispatching
+        self.loaded = False
+        self.objects = {}
+        self.paths_by_interface = {}
+        self.devices_by_adapter = {}
+        self.device_by_address = {}
+        self.children_by_device = {}
+        self.removed_callbacks = []
+        self.removal_waiters = {}
+        self.signal_matches = []
+
+    def load(self):
+        """Subscribe to the BlueZ ObjectManager signals and fetch the initial tree once."""
+        if self.loaded:
+            return
+        self.signal_matches = [
+            self.bus.add_signal_receiver(
+                self.on_interfaces_added,
+                dbus_interface=constants.object_manager_interface,
+                signal_name="InterfacesAdded",
+                bus_name=constants.bluez_service),
+            self.bus.add_signal_receiver(
+                self.on_interfaces_removed,
+                dbus_interface=constants.object_manager_interface,
+                signal_name="InterfacesRemoved",
+                bus_name=constants.bluez_service),
+            self.bus.add_signal_receiver(
+                self.on_properties_changed,
+                dbus_interface=constants.properties_interface,
+                signal_name="PropertiesChanged",
+                bus_name=constants.bluez_service,
+                path_keyword="path"),
+            self.bus.add_signal_receiver(
+                self.on_name_owner_changed,
+                dbus_interface="org.freedesktop.DBus",
+                signal_name="NameOwnerChanged",
+                bus_name="org.freedesktop.DBus",
+                arg0=constants.bluez_service),
+        ]
+        self.reload()
+        self.loaded = True
+
+    def reload(self):
+        """Replace the cached tree with a fresh GetManagedObjects reply.
+
+        Objects and interfaces missing from the reply go through on_interfaces_removed,
+        so removal waiters and callbacks fire as if BlueZ had signalled them.
+        """
+        object_manager = dbus.Interface(self.bus.get_object(constants.bluez_service, "/", introspect=False),
+                                        constants.object_manager_interface)
+        managed_objects = {str(path): interfaces for path, interfaces in object_manager.GetManagedObjects().items()}
+        self.forget_missing(managed_objects)
+        for path, interfaces in managed_objects.items():
+            self.on_interfaces_added(path, interfaces)
+
+    def forget_missing(self, managed_objects):
+        """Remove every cached interface that is not present in managed_objects."""
+        for path, entry in list(self.objects.items()):
+            current = managed_objects.get(path, {})
+            missing = [interface for interface in entry if interface not in current]
+            if missing:
+                self.on_interfaces_removed(path, missing)
+
+    def refresh(self):
+        """Reload the tree if no loop is dispatching signals, so lookups are never stale."""
+        if self.loaded and self.is_dispatching is not None and not self.is_dispatching():
+            try:
+                self.reload()
+            except dbus.exceptions.DBusException as error:
+                if self.log:
+                    self.log.warning("Could not reload the BlueZ object tree: %s", error)
+
+    def on_name_owner_changed(self, name, old_owner, new_owner):
+        """Resynchronise with bluetoothd when it exits or restarts.
+
+        Args:
+            name: Bus name whose owner changed (org.bluez).
+            old_owner: Previous unique name, empty if the name was unowned.
+            new_owner: New unique name, empty if bluetoothd went away.
+        """
+        if self.log:
+            self.log.info("org.bluez owner changed from '%s' to '%s'", old_owner, new_owner)
+        if not new_owner:
+            self.forget_missing({})
+            return
+        try:
+            self.reload()
+        except dbus.exceptions.DBusException as error:
+            if self.log:
+                self.log.warning("Could not reload the BlueZ object tree: %s", error)
+
+    def close(self):
+        """Drop the signal subscriptions and forget every cached object."""
+        for match in self.signal_matches:
+            match.remove()
+        self.signal_matches = []
+        self.objects.clear()
+        self.paths_by_interface.clear()
+        self.devices_by_adapter.clear()
+        self.device_by_address.clear()
+        self.children_by_device.clear()
+        self.loaded = False
+
+    def on_interfaces_added(self, path, interfaces):
+        """Merge newly exported interfaces into the cache.
+
+        Args:
+            path: D-Bus object path of the object.
+            interfaces: Mapping of interface name to its properties.
+        """
+        path = str(path)
+        entry = self.objects.setdefault(path, {})
+        for interface, properties in interfaces.items():
+            interface = str(interface)
+            entry[interface] = dict(properties)
+            self.paths_by_interface.setdefault(interface, set()).add(path)
+            if interface == constants.device_interface:
+                self._index_device(path, entry[interface])
+        device_path = get_device_path_of(path)
+        if device_path and device_path != path:
+            self.children_by_device.setdefault(device_path, set()).add(path)
+
+    def on_interfaces_removed(self, path, interfaces):
+        """Remove interfaces that BlueZ dropped, and the object once it has none left.
+
+        Args:
+            path: D-Bus object path of the object.
+            interfaces: List of removed interface names.
+        """
+        path = str(path)
+        entry = self.objects.get(path)
+        if entry is None:
+            return
+        for interface in interfaces:
+            interface = str(interface)
+            properties = entry.pop(interface, None)
+            paths = self.paths_by_interface.get(interface)
+            if paths is not None:
+                paths.discard(path)
+            if interface == constants.device_interface and properties is not None:
+                self._unindex_device(path, properties)
+        if not entry:
+            del self.objects[path]
+            device_path = get_device_path_of(path)
+            if device_path and device_path != path:
+                children = self.children_by_device.get(device_path)
+                if children is not None:
+                    children.discard(path)
+                    if not children:
+                        del self.children_by_device[device_path]
+        # Detach the resolved waiters before resolving them: their done callbacks may
+        # call cancel_removal_wait, which edits removal_waiters.
+        resolved = []
+        waiters = self.removal_waiters.pop(path, None)
+        if waiters:
+            removed = {str(interface) for interface in interfaces}
+            for interface, future in waiters:
+                if interface is None or interface in removed or path not in self.objects:
+                    resolved.append(future)
+                else:
+                    self.removal_waiters.setdefault(path, []).append((interface, future))
+        for callback in list(self.removed_callbacks):
+            try:
+                callback(path, [str(interface) for interface in interfaces])
+            except Exception as error:
+                if self.log:
+                    self.log.warning("Object removal callback failed for %s: %s", path, error)
+        for future in resolved:
+            if not future.done():
+                future.set_result(path)
+
+    def on_properties_changed(self, interface, changed, invalidated, path):
+        """Apply a PropertiesChanged signal to the cached copy of the object.
+
+        Args:
+            interface: The D-Bus interface name where the property change occurred.
+            changed: A dictionary containing the properties that changed and their new values.
+            invalidated: A list of properties that are no longer valid.
+            path: The D-Bus object path for the signal.
+        """
+        properties = self.objects.get(str(path), {}).get(str(interface))
+        if properties is None:
+            return
+        properties.update(changed)
+        for name in invalidated:
+            properties.pop(str(name), None)
+
+    def add_removed_callback(self, callback):
+        """Register a callback invoked as callback(path, interfaces) on InterfacesRemoved."""
+        self.removed_callbacks.append(callback)
+
+    def remove_removed_callback(self, callback):
+        """Unregister a callback previously added with add_removed_callback."""
+        if callback in self.removed_callbacks:
+            self.removed_callbacks.remove(callback)
+
+    def wait_for_removal(self, path, interface=None):
+        """Return a future resolved when BlueZ removes an object (or one of its interfaces).
+
+        Args:
+            path: D-Bus object path to watch.
+            interface: Interface whose removal resolves the future, or None for any.
+
+        Returns:
+            concurrent.futures.Future resolved with the path once the removal is signalled.
+        """
+        path = str(path)
+        future = Future()
+        future.set_running_or_notify_cancel()
+        self.refresh()
+        entry = self.objects.get(path)
+        if entry is None or (interface is not None and interface not in entry):
+            future.set_result(path)
+            return future
+        self.removal_waiters.setdefault(path, []).append((interface, future))
+        return future
+
+    def cancel_removal_wait(self, path, future):
+        """Stop tracking a future returned by wait_for_removal."""
+        waiters = self.removal_waiters.get(str(path), [])
+        for waiter in list(waiters):
+            if waiter[1] is future:
+                waiters.remove(waiter)
+        if not waiters:
+            self.removal_waiters.pop(str(path), None)
+
+    def _index_device(self, path, properties):
+        adapter = str(properties.get("Adapter", ""))
+        address = str(properties.get("Address", "")).upper()
+        self.devices_by_adapter.setdefault(adapter, set()).add(path)
+        if address:
+            self.device_by_address[(adapter, address)] = path
+
+    def _unindex_device(self, path, properties):
+        adapter = str(properties.get("Adapter", ""))
+        address = str(properties.get("Address", "")).upper()
+        devices = self.devices_by_adapter.get(adapter)
+        if devices is not None:
+            devices.discard(path)
+        if self.device_by_address.get((adapter, address)) == path:
+            del self.device_by_address[(adapter, address)]
+
+    def get_properties(self, path, interface):
+        """Return the cached properties of one interface on one object.
+
+        Args:
+            path: D-Bus object path.
+            interface: Interface name.
+
+        Returns:
+            Dictionary of properties, or None if the object or interface is unknown.
+        """
+        self.refresh()
+        return self.objects.get(str(path), {}).get(interface)
+
+    def get_devices(self, adapter_path):
+        """Return the Device1 properties of every device known under an adapter.
+
+        Args:
+            adapter_path: Adapter object path (e.g. /org/bluez/hci0).
+
+        Returns:
+            Dictionary mapping device path to its Device1 properties.
+        """
+        self.refresh()
+        return {path: self.objects[path][constants.device_interface]
+                for path in self.devices_by_adapter.get(adapter_path, ())}
+
+    def find_device_path(self, adapter_path, address):
+        """Return the object path of a device by adapter and address.
+
+        Args:
+            adapter_path: Adapter object path.
+            address: Bluetooth address of remote device.
+
+        Returns:
+            Device object path, or None if BlueZ does not know the device.
+        """
+        self.refresh()
+        return self.device_by_address.get((adapter_path, address.upper()))
+
+    def get_device_properties(self, adapter_path, address):
+        """Return the cached Device1 properties of a device by adapter and address."""
+        self.refresh()
+        path = self.device_by_address.get((adapter_path, address.upper()))
+        if not path:
+            return None
+        return self.objects.get(path, {}).get(constants.device_interface)
+
+    def find_device_interface(self, adapter_path, address, interface):
+        """Return the path of the first object below a device that exports an interface.
+
+        Args:
+            adapter_path: Adapter object path.
+            address: Bluetooth address of remote device.
+            interface: Interface name (e.g. org.bluez.MediaTransport1).
+
+        Returns:
+            Object path, or None if no such object is exported.
+        """
+        self.refresh()
+        device_path = self.device_by_address.get((adapter_path, address.upper()))
+        if not device_path:
+            return None
+        if interface in self.objects.get(device_path, {}):
+            return device_path
+        for path in sorted(self.children_by_device.get(device_path, ())):
+            if interface in self.objects.get(path, {}):
+                return path
+        return None
+
+
+class BluezProxyPool:
+    """Bounded, path-keyed pool of BlueZ proxy objects and their interface wrappers.
+
+    Creating a proxy with bus.get_object introspects the remote object, so the
+    pool keeps recently used proxies (least recently used entries are dropped
+    once max_size is reached) and forgets a path as soon as BlueZ removes it.
+    """
+
+    def __init__(self, bus, service=constants.bluez_service, max_size=64):
+        """Initialize an empty pool.
+
+        Args:
+            bus: D-Bus connection used to create proxies.
+            service: Bus name that owns the pooled objects.
+            max_size: Maximum number of object paths kept in the pool.
+        """
+        self.bus = bus
+        self.service = service
+        self.max_size = max_size
+        self.entries = OrderedDict()
+
+    def get_proxy(self, path):
+        """Return a (cached) proxy for the given object path."""
+        path = str(path)
+        entry = self.entries.get(path)
+        if entry is None:
+            entry = {"proxy": self.bus.get_object(self.service, path), "interfaces": {}}
+            self.entries[path] = entry
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        else:
+            self.entries.move_to_end(path)
+        return entry["proxy"]
+
+    def get_interface(self, path, interface):
+        """Return a (cached) dbus.Interface wrapper for the given object path.
+
+        Args:
+            path: D-Bus object path.
+            interface: Interface name to wrap the proxy with.
+
+        Returns:
+            dbus.Interface bound to the pooled proxy.
+        """
+        proxy = self.get_proxy(path)
+        interfaces = self.entries[str(path)]["interfaces"]
+        wrapper = interfaces.get(interface)
+        if wrapper is None:
+            wrapper = dbus.Interface(proxy, interface)
+            interfaces[interface] = wrapper
+        return wrapper
+
+    def evict(self, path):
+        """Forget the proxy and wrappers of one object path."""
+        self.entries.pop(str(path), None)
+
+    def on_object_removed(self, path, interfaces):
+        """BluezObjectCache removal callback: evict objects BlueZ no longer exports."""
+        self.evict(path)
+
+    def clear(self):
+        """Forget every pooled proxy."""
+        self.entries.clear()
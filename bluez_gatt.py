@@ -3,8 +3,10 @@ import dbus.mainloop.glib
 import dbus.service
 import os
 import subprocess
+import threading
 import time
 
+from concurrent.futures import Future, TimeoutError
 from dbus.mainloop.glib import DBusGMainLoop
 from gi.repository import GLib
 
@@ -12,36 +14,28 @@ DBusGMainLoop(set_as_default=True)
 
 from libraries.bluetooth import constants
 from libraries.bluetooth.agent import Agent
+from libraries.bluetooth.bluez_cache import BluezObjectCache, BluezProxyPool
+from libraries.bluetooth.obex_transfer import ObexTransfer
+from libraries.bluetooth.opp_receiver import OppReceiveServer
+from libraries.bluetooth import test_gatt_server
 from Utils.utils import run
-from libraries.bluetooth.test_gatt_server import (
-    Application,
-    Advertisement,
-    BatteryService,
-    BatteryLevelCharacteristic,
-    BatteryLevelDescriptor,
-    BatteryLevelStatusCharacteristic,
-    ScanParametersService,
-    ScanIntervalWindowCharacteristic,
-    ScanRefreshCharacteristic,
-    FindMeService,
-    ImmediateAlertCharacteristic,
-    HealthThermometerService,
-MeasurementIntervalCharacteristic,
-TemperatureTypeCharacteristic,
-IntermediateTemperatureCharacteristic, TemperatureMeasurementCharacteristic, HTDescriptor
-)
+from libraries.bluetooth.test_gatt_server import Application, Advertisement, build_service
 
 class BluetoothDeviceManager:
     """A class for managing Bluetooth devices using the BlueZ D-Bus API."""
 
-    def __init__(self, log=None, interface=None):
+    def __init__(self, log=None, interface=None, external_loop=False):
         """Initialize the BluetoothDeviceManager by setting up the system bus and adapter.
 
         Args:
             log: Logger instance.
             interface: Bluetooth adapter interface (e.g., hci0).
+            external_loop: True if the host already iterates the default GLib context
+                (e.g. Qt's GLib event dispatcher), so D-Bus signals are always dispatched.
         """
         self.mainloop = GLib.MainLoop()
+        self.mainloop_thread = None
+        self.external_loop = external_loop
         self.agent = None
         self.bus = dbus.SystemBus()
         self.interface = interface
@@ -51,15 +45,35 @@ class BluetoothDeviceManager:
         self.adapter_proxy = self.bus.get_object(constants.bluez_service, self.adapter_path)
         self.adapter = dbus.Interface(self.adapter_proxy, constants.adapter_interface)
         self.adapter_properties = dbus.Interface(self.adapter_proxy, constants.properties_interface)
-        self.object_manager = dbus.Interface(self.bus.get_object(constants.bluez_service, "/"), constants.object_manager_interface)
-        self.opp_process = None
+        self.object_cache = BluezObjectCache(self.bus, self.log, self.is_loop_dispatching)
+        self.object_cache.load()
+        self.proxy_pool = BluezProxyPool(self.bus, constants.bluez_service)
+        self.object_cache.add_removed_callback(self.proxy_pool.on_object_removed)
+        self.opp_server = None
+        self.session_bus = None
+        self.obex_manager = None
+        self.obex_sessions = {}
+        self.obex_session_idle_timeout = 30
+        self.obex_evict_timer_id = None
+        self.obex_transfers = {}
+        self.obex_transfers_starting = 0
+        self.obex_transfer_match = None
         self.pulseaudio_process = None
         self.stream_process = None
         self.advertisement_instance = 0
+        self.advertisements = {}
+        self.advertisements_pending = 0
+        self.advertisement_rotations = {}
         self.application = None
         self.advertisement = None
+        self.advertisement_registration = None
         self.is_server_running = False
         self.is_advertising = False
+        self.service_specs = {}
+        self.service_options = {}
+        self.gatt_services = {}
+        self.is_registering = False
+        self.gatt_reregister_pending = False
 
     def get_paired_devices(self):
         """Retrieves all Bluetooth devices that are currently paired with the adapter.
@@ -68,13 +82,11 @@ class BluetoothDeviceManager:
             paired_devices: A dictionary of paired devices.
         """
         paired_devices = {}
-        for path, interfaces in self.object_manager.GetManagedObjects().items():
-            if constants.device_interface in interfaces:
-                device = interfaces[constants.device_interface]
-                if device.get("Paired") and device.get("Adapter") == self.adapter_path:
-                    address = device.get("Address")
-                    name = device.get("Name", "Unknown")
-                    paired_devices[address] = name
+        for path, device in self.object_cache.get_devices(self.adapter_path).items():
+            if device.get("Paired"):
+                address = device.get("Address")
+                name = device.get("Name", "Unknown")
+                paired_devices[address] = name
         return paired_devices
 
     def start_discovery(self):
@@ -106,10 +118,7 @@ class BluetoothDeviceManager:
             discovered_devices: List of discovered Bluetooth devices.
         """
         discovered_devices = []
-        for path, interfaces in self.object_manager.GetManagedObjects().items():
-            device = interfaces.get(constants.device_interface)
-            if not device or device.get("Adapter") != self.adapter_path:
-                continue
+        for path, device in self.object_cache.get_devices(self.adapter_path).items():
             address = device.get("Address")
             alias = device.get("Alias", "Unknown")
             if address:
@@ -135,6 +144,18 @@ class BluetoothDeviceManager:
         return device_path
 
 
+    def get_device_interface(self, device_path, interface):
+        """Return a pooled D-Bus interface wrapper for a BlueZ object.
+
+        Args:
+            device_path: D-Bus object path of the remote object.
+            interface: Interface name (e.g. org.bluez.Device1).
+
+        Returns:
+            dbus.Interface reused across calls until BlueZ removes the object.
+        """
+        return self.proxy_pool.get_interface(device_path, interface)
+
     def setup_agent(self, ui_callback):
         """Ensures the Bluetooth agent object is created and ready."""
         self.agent = Agent(self.bus, constants.agent_path, ui_callback, self.log)
@@ -173,9 +194,8 @@ class BluetoothDeviceManager:
         """
         device_path = self.get_device_path(address)
         try:
-            device_proxy = self.bus.get_object(constants.bluez_service, device_path)
-            device = dbus.Interface(device_proxy, constants.device_interface)
-            properties = dbus.Interface(device_proxy, constants.properties_interface)
+            device = self.get_device_interface(device_path, constants.device_interface)
+            properties = self.get_device_interface(device_path, constants.properties_interface)
             paired = properties.Get(constants.device_interface, "Paired")
             if paired:
                 self.log.info("Device %s is already paired.", address)
@@ -186,12 +206,13 @@ class BluetoothDeviceManager:
             if paired:
                 self.log.info("Successfully paired with %s", address)
                 return True
+            return False
         except dbus.exceptions.DBusException as error:
             if "NoReply" in error.get_dbus_name():
                 self.log.info("Pair() timed out for %s, ignoring as pairing may still succeed.", address)
-            else:
-                self.log.error("Pairing failed with %s: %s", address, str(error))
-                return False
+                return bool(self.is_device_paired(address))
+            self.log.error("Pairing failed with %s: %s", address, str(error))
+            return False
 
     def connect(self, address):
         """Establish a  connection to the specified Bluetooth device.
@@ -204,9 +225,9 @@ class BluetoothDeviceManager:
         """
         device_path = self.get_device_path(address)
         try:
-            device = dbus.Interface(self.bus.get_object(constants.bluez_service, device_path), constants.device_interface)
+            device = self.get_device_interface(device_path, constants.device_interface)
             device.Connect()
-            properties = dbus.Interface(self.bus.get_object(constants.bluez_service, device_path), constants.properties_interface)
+            properties = self.get_device_interface(device_path, constants.properties_interface)
             connected = properties.Get(constants.device_interface, "Connected")
             if connected:
                 self.log.info("Connection successful to %s", address)
@@ -224,10 +245,11 @@ class BluetoothDeviceManager:
         Returns:
             True if disconnected or already disconnected, False if an error occurred.
         """
+        self.release_obex_session(address)
         device_path = self.get_device_path(address)
         try:
-            device = dbus.Interface(self.bus.get_object(constants.bluez_service, device_path), constants.device_interface)
-            properties = dbus.Interface(self.bus.get_object(constants.bluez_service, device_path), constants.properties_interface)
+            device = self.get_device_interface(device_path, constants.device_interface)
+            properties = self.get_device_interface(device_path, constants.properties_interface)
             connected = properties.Get(constants.device_interface, "Connected")
             if not connected:
                 self.log.info("Device %s is already disconnected.", address)
@@ -238,37 +260,284 @@ class BluetoothDeviceManager:
             self.log.info("Error disconnecting device %s:%s", address, error)
             return False
 
-    def unpair_device(self, address):
+    def call_device_method_async(self, address, method_name, ignored_errors=(), timeout=None):
+        """Invoke a org.bluez.Device1 method without blocking and resolve a future on completion.
+
+        The call is dispatched with reply_handler/error_handler, so the result is
+        delivered by whichever GLib main loop is running (the one integrated with
+        Qt in the GUI).
+
+        Args:
+            address: Bluetooth address of remote device.
+            method_name: Device1 method to call (e.g. "Pair", "Connect").
+            ignored_errors: D-Bus error names that still count as success.
+            timeout: Optional D-Bus call timeout in seconds.
+
+        Returns:
+            concurrent.futures.Future resolved with True on success, False otherwise.
+        """
+        future = Future()
+        future.set_running_or_notify_cancel()
+        device_path = self.get_device_path(address)
+
+        def on_reply(*args):
+            self.log.info("%s completed for %s", method_name, address)
+            if not future.done():
+                future.set_result(True)
+
+        def on_error(error):
+            error_name = error.get_dbus_name() if isinstance(error, dbus.exceptions.DBusException) else None
+            if error_name in ignored_errors:
+                self.log.info("%s for %s returned %s, treating as success.", method_name, address, error_name)
+                result = True
+            elif error_name and "NoReply" in error_name and method_name == "Pair":
+                self.log.info("Pair() timed out for %s, using the current Paired state.", address)
+                properties = self.object_cache.get_properties(device_path, constants.device_interface) or {}
+                result = bool(properties.get("Paired"))
+            else:
+                self.log.error("%s failed for %s: %s", method_name, address, error)
+                result = False
+            if not future.done():
+                future.set_result(result)
+
+        call_options = {"reply_handler": on_reply, "error_handler": on_error}
+        if timeout is not None:
+            call_options["timeout"] = timeout
+        try:
+            device = self.get_device_interface(device_path, constants.device_interface)
+            getattr(device, method_name)(**call_options)
+        except dbus.exceptions.DBusException as error:
+            on_error(error)
+        return future
+
+    def pair_async(self, address, timeout=None):
+        """Start pairing with a device without blocking the caller.
+
+        Args:
+            address: Bluetooth address of remote device.
+            timeout: Optional D-Bus call timeout in seconds.
+
+        Returns:
+            Future resolved with True once paired, False if pairing failed.
+        """
+        properties = self.object_cache.get_device_properties(self.adapter_path, address)
+        if properties and properties.get("Paired"):
+            self.log.info("Device %s is already paired.", address)
+            future = Future()
+            future.set_result(True)
+            return future
+        self.log.info("Initiating pairing with %s", address)
+        return self.call_device_method_async(address, "Pair", ("org.bluez.Error.AlreadyExists",), timeout)
+
+    def connect_async(self, address, timeout=None):
+        """Start connecting to a device without blocking the caller.
+
+        Args:
+            address: Bluetooth address of remote device.
+            timeout: Optional D-Bus call timeout in seconds.
+
+        Returns:
+            Future resolved with True once connected, False if the connection failed.
+        """
+        return self.call_device_method_async(address, "Connect", ("org.bluez.Error.AlreadyConnected",), timeout)
+
+    def disconnect_async(self, address, timeout=None):
+        """Start disconnecting a device without blocking the caller.
+
+        Args:
+            address: Bluetooth address of remote device.
+            timeout: Optional D-Bus call timeout in seconds.
+
+        Returns:
+            Future resolved with True once disconnected or already disconnected, False on error.
+        """
+        self.release_obex_session(address)
+        properties = self.object_cache.get_device_properties(self.adapter_path, address)
+        if properties is not None and not properties.get("Connected"):
+            self.log.info("Device %s is already disconnected.", address)
+            future = Future()
+            future.set_result(True)
+            return future
+        return self.call_device_method_async(address, "Disconnect", ("org.bluez.Error.NotConnected",), timeout)
+
+    def wait_for_future(self, future, timeout=None):
+        """Iterate the default GLib main context until a future completes.
+
+        Intended for scripts and regression rigs that have no main loop running;
+        inside the GUI use future.add_done_callback instead.
+
+        Args:
+            future: concurrent.futures.Future returned by one of the *_async methods.
+            timeout: Maximum time to wait in seconds, or None to wait forever.
+
+        Returns:
+            The future's result, or None if the timeout expired first.
+        """
+        if self.mainloop_thread is not None and self.mainloop_thread.is_alive():
+            # The loop thread owns the GLib context and completes the future for us.
+            try:
+                return future.result(timeout)
+            except TimeoutError:
+                return None
+        context = GLib.MainContext.default()
+        expired = []
+        timer_id = None
+        if timeout is not None:
+            def on_timeout():
+                expired.append(True)
+                return False
+            timer_id = GLib.timeout_add(int(timeout * 1000), on_timeout)
+        while not future.done() and not expired:
+            context.iteration(True)
+        if timer_id is not None and not expired:
+            GLib.source_remove(timer_id)
+        return future.result() if future.done() else None
+
+    def run_device_batch(self, addresses, start_operation, concurrency=4):
+        """Run an async device operation over many devices with a concurrency limit.
+
+        Args:
+            addresses: Iterable of Bluetooth addresses.
+            start_operation: Callable taking an address and returning a Future (e.g. self.connect_async).
+            concurrency: Maximum number of operations in flight at once.
+
+        Returns:
+            Future resolved with {address: {"result": bool, "elapsed": seconds}} in input order.
+        """
+        batch_future = Future()
+        batch_future.set_running_or_notify_cancel()
+        addresses = list(dict.fromkeys(addresses))
+        results = {}
+        pending = iter(addresses)
+        state = {"active": 0, "filling": False}
+        concurrency = max(1, concurrency)
+
+        def on_done(address, start, done):
+            try:
+                result = bool(done.result())
+            except Exception as error:
+                self.log.error("Batch operation failed for %s: %s", address, error)
+                result = False
+            results[address] = {"result": result, "elapsed": time.monotonic() - start}
+            state["active"] -= 1
+            if len(results) == len(addresses):
+                batch_future.set_result({address: results[address] for address in addresses})
+            else:
+                fill()
+
+        def fill():
+            if state["filling"]:
+                return
+            state["filling"] = True
+            try:
+                while state["active"] < concurrency:
+                    address = next(pending, None)
+                    if address is None:
+                        break
+                    state["active"] += 1
+                    start = time.monotonic()
+                    try:
+                        future = start_operation(address)
+                    except Exception as error:
+                        future = Future()
+                        future.set_exception(error)
+                    future.add_done_callback(lambda done, address=address, start=start: on_done(address, start, done))
+            finally:
+                state["filling"] = False
+
+        if not addresses:
+            batch_future.set_result({})
+        else:
+            fill()
+        return batch_future
+
+    def pair_many(self, addresses, concurrency=4):
+        """Pair with many devices in parallel, see run_device_batch."""
+        return self.run_device_batch(addresses, self.pair_async, concurrency)
+
+    def connect_many(self, addresses, concurrency=4):
+        """Connect to many devices in parallel, see run_device_batch."""
+        return self.run_device_batch(addresses, self.connect_async, concurrency)
+
+    def disconnect_many(self, addresses, concurrency=4):
+        """Disconnect many devices in parallel, see run_device_batch."""
+        return self.run_device_batch(addresses, self.disconnect_async, concurrency)
+
+    def unpair_async(self, address, timeout=5):
+        """Remove a device and resolve a future once BlueZ signals its removal.
+
+        The device path comes from the object cache's address index and completion
+        is taken from the matching InterfacesRemoved signal, so there is no fixed
+        sleep and no rescan of the object tree.
+
+        Args:
+            address: The Bluetooth address of the remote device.
+            timeout: Seconds to wait for the InterfacesRemoved signal.
+
+        Returns:
+            Future resolved with True if the device was removed or already not present,
+            False if RemoveDevice failed or the device still exists after the timeout.
+        """
+        future = Future()
+        future.set_running_or_notify_cancel()
+        target_path = self.object_cache.find_device_path(self.adapter_path, address)
+        if not target_path:
+            self.log.info("Device with address %s not found on %s", address, self.interface)
+            future.set_result(True)
+            return future
+
+        removed = self.object_cache.wait_for_removal(target_path, constants.device_interface)
+        timer = {}
+
+        def finish(result):
+            timer_id = timer.pop("id", None)
+            if timer_id is not None:
+                GLib.source_remove(timer_id)
+            self.object_cache.cancel_removal_wait(target_path, removed)
+            if not future.done():
+                future.set_result(result)
+
+        def on_removed(done):
+            self.log.info("Device %s unpaired successfully", address)
+            finish(True)
+
+        def on_timeout():
+            timer.pop("id", None)
+            self.log.warning("Device %s still exists after attempted unpair", address)
+            finish(False)
+            return False
+
+        def on_reply():
+            self.log.info("Requested unpair of device %s at path %s", address, target_path)
+
+        def on_error(error):
+            self.log.error("DBusException while unpairing device %s: %s", address, str(error))
+            finish(False)
+
+        timer["id"] = GLib.timeout_add(int(timeout * 1000), on_timeout)
+        removed.add_done_callback(on_removed)
+        try:
+            self.adapter.RemoveDevice(target_path, reply_handler=on_reply, error_handler=on_error)
+        except dbus.exceptions.DBusException as error:
+            on_error(error)
+        return future
+
+    def unpair_device(self, address, timeout=5):
         """Unpairs a paired or known Bluetooth device from the system using BlueZ D-Bus.
 
         Args:
             address: The Bluetooth address of the remote device.
+            timeout: Seconds to wait for BlueZ to confirm the removal.
 
         Returns:
             True if the device was unpaired successfully or already not present,
             False if the unpairing failed or the device still exists afterward.
         """
-        try:
-            target_path = None
-            for path, interfaces in self.object_manager.GetManagedObjects().items():
-                if constants.device_interface in interfaces and interfaces[constants.device_interface].get("Address") == address and path.startswith(self.adapter_path):
-                    target_path = path
-                    break
-            if not target_path:
-                self.log.info("Device with address %s not found on %s", address, self.interface)
-                return True
-            self.adapter.RemoveDevice(target_path)
-            self.log.info("Requested unpair of device %s at path %s", address, target_path)
-            time.sleep(0.5)
-            for path, interfaces in self.object_manager.GetManagedObjects().items():
-                if constants.device_interface in interfaces and interfaces[constants.device_interface].get("Address") == address:
-                        self.log.warning("Device %s still exists after attempted unpair", address)
-                        return False
-            self.log.info("Device %s unpaired successfully", address)
-            return True
-        except dbus.exceptions.DBusException as error:
-            self.log.error("DBusException while unpairing device %s: %s", address, str(error))
-            return False
+        return bool(self.wait_for_future(self.unpair_async(address, timeout)))
+
+    def unpair_many(self, addresses, concurrency=4):
+        """Unpair many devices in parallel, see run_device_batch."""
+        return self.run_device_batch(addresses, self.unpair_async, concurrency)
 
     def is_device_paired(self, device_address):
         """Checks if the specified device is paired.
@@ -280,8 +549,8 @@ class BluetoothDeviceManager:
             True if paired, False otherwise.
         """
         device_path = self.get_device_path(device_address)
-        properties = dbus.Interface(self.bus.get_object(constants.bluez_service, device_path), constants.properties_interface)
         try:
+            properties = self.get_device_interface(device_path, constants.properties_interface)
             return properties.Get(constants.device_interface, "Paired")
         except dbus.exceptions.DBusException as error:
             self.log.debug("DBusException while checking pairing:%s", str(error))
@@ -301,7 +570,7 @@ class BluetoothDeviceManager:
             self.log.debug("Device path not found for %s on %s", device_address, self.interface)
             return False
         try:
-            properties = dbus.Interface(self.bus.get_object(constants.bluez_service, device_path), constants.properties_interface)
+            properties = self.get_device_interface(device_path, constants.properties_interface)
             connected = properties.Get(constants.device_interface, "Connected")
             return connected
         except dbus.exceptions.DBusException as error:
@@ -375,12 +644,10 @@ class BluetoothDeviceManager:
             The MediaControl1 D-Bus interface if found, otherwise None.
         """
         try:
-            formatted_addr = address.replace(":", "_").upper()
-            for path, interfaces in self.object_manager.GetManagedObjects().items():
-                if constants.media_control_interface in interfaces:
-                    if formatted_addr in path and path.startswith(self.adapter_path):
-                        self.log.info("Found MediaControl1 at %s", path)
-                        return dbus.Interface(self.bus.get_object(constants.bluez_service, path), constants.media_control_interface)
+            path = self.object_cache.find_device_interface(self.adapter_path, address, constants.media_control_interface)
+            if path:
+                self.log.info("Found MediaControl1 at %s", path)
+                return dbus.Interface(self.bus.get_object(constants.bluez_service, path), constants.media_control_interface)
             self.log.info(" No MediaControl1 interface found for %s under %s", address, self.adapter_path)
         except Exception as error:
             self.log.info(" Exception while getting MediaControl1 interface : %s", error)
@@ -396,66 +663,232 @@ class BluetoothDeviceManager:
             str: "sink", "source", or None
         """
         uuid_map = {"source": "110a", "sink": "110b"}
-        for path, interfaces in self.object_manager.GetManagedObjects().items():
-            if constants.device_interface in interfaces:
-                properties = interfaces[constants.device_interface]
-                if properties.get("Address") == device_address and properties.get("Connected") and properties.get("Adapter") == self.adapter_path:
-                    uuids = properties.get("UUIDs", [])
-                    for role, uuid_role in uuid_map.items():
-                        if any(uuid_role in uuid.lower() for uuid in uuids):
-                            return role
+        properties = self.object_cache.get_device_properties(self.adapter_path, device_address)
+        if properties and properties.get("Connected"):
+            uuids = properties.get("UUIDs", [])
+            for role, uuid_role in uuid_map.items():
+                if any(uuid_role in uuid.lower() for uuid in uuids):
+                    return role
         self.log.warning("Unknown A2DP role %s", device_address)
 
-    def send_file(self, device_address, file_path, session_path=None, profile=None):
+    def send_file(self, device_address, file_path, session_path=None, profile="opp"):
         """Send a file via OBEX OPP and wait for real-time transfer status.
 
         Args:
             device_address: Bluetooth address of remote device.
             file_path: Path to the file to be sent.
-            session_path: Existing OBEX session path. If None, a new session is created.
+            session_path: Existing OBEX session path. If None, the pooled session of the device is used.
             profile: Bluetooth profile to use for the file transfer.
 
         Returns:
-            Transfer status ("completed", "error", etc.).
+            Transfer status ("complete", "error", etc.).
+        """
+        transfer = self.send_file_async(device_address, file_path, session_path, profile)
+        self.wait_for_future(transfer.future)
+        return transfer.status
+
+    def send_files(self, device_address, file_paths, profile="opp"):
+        """Send several files over the device's pooled OBEX session and wait for all of them.
+
+        Args:
+            device_address: Bluetooth address of remote device.
+            file_paths: Paths of the files to send.
+            profile: Bluetooth profile to use for the session.
+
+        Returns:
+            Dictionary mapping each file path to its final transfer status.
+        """
+        transfers = self.send_files_async(device_address, file_paths, profile)
+        for transfer in transfers:
+            self.wait_for_future(transfer.future)
+        return {transfer.file_path: transfer.status for transfer in transfers}
+
+    def send_files_async(self, device_address, file_paths, profile="opp", progress_callback=None):
+        """Queue several pushes on the device's pooled OBEX session without blocking.
+
+        obexd sends the queued files in order, so only the first one pays for session setup.
+
+        Args:
+            device_address: Bluetooth address of remote device.
+            file_paths: Paths of the files to send.
+            profile: Bluetooth profile to use for the session.
+            progress_callback: Optional callable invoked with each ObexTransfer on progress.
+
+        Returns:
+            List of ObexTransfer handles, in the order of file_paths.
         """
+        return [self.send_file_async(device_address, file_path, None, profile, progress_callback)
+                for file_path in file_paths]
+
+    def send_file_async(self, device_address, file_path, session_path=None, profile="opp", progress_callback=None):
+        """Start an OBEX OPP push and return immediately.
+
+        Progress comes from Transfer1 PropertiesChanged signals, dispatched by whichever
+        loop runs the default GLib context; several transfers can be in flight at once.
+
+        Args:
+            device_address: Bluetooth address of remote device.
+            file_path: Path to the file to be sent.
+            session_path: Existing OBEX session path. If None, the pooled session of the device is used.
+            profile: Bluetooth profile to use for the session.
+            progress_callback: Optional callable invoked with the ObexTransfer on progress.
+
+        Returns:
+            ObexTransfer handle; its future resolves with the final status.
+        """
+        transfer = ObexTransfer(file_path, progress_callback)
         if not os.path.exists(file_path):
             self.log.info("File does not exist: %s", file_path)
-            return "error"
+            transfer.finish("error")
+            return transfer
+        transfer.size = os.path.getsize(file_path)
+        self.start_obex_transfer(transfer, device_address, session_path, profile, retry=True)
+        return transfer
+
+    def start_obex_transfer(self, transfer, device_address, session_path, profile, retry):
+        """Issue ObjectPush1.SendFile for a transfer and track it until it finishes.
+
+        The Transfer1 signal match is added before SendFile is called, and
+        obex_transfers_starting counts the calls whose reply is still pending. While
+        it is non-zero, unwatch_obex_transfers keeps the match even if every tracked
+        transfer has finished, so the status signals of a transfer whose reply is
+        about to arrive are not lost. on_started and on_error each decrement the
+        counter exactly once per SendFile call.
 
-        try:
-            if not session_path:
-                session_path = self.create_obex_session(device_address, profile)
+        Args:
+            transfer: ObexTransfer to start; finished with "error" if it cannot be sent.
+            device_address: Bluetooth address of remote device.
+            session_path: Existing OBEX session path, or None to use the device's pooled session.
+            profile: Bluetooth profile used when a pooled session has to be created.
+            retry: True to start a fresh pooled session once if obexd dropped the pooled one.
 
-            opp_interface = dbus.Interface(
-                self.session_bus.get_object(constants.obex_service, session_path),
-                constants.obex_object_push
-            )
-            transfer_path, _ = opp_interface.SendFile(file_path)
+        Returns:
+            None. The outcome is reported through transfer.future.
+        """
+        pooled = not session_path
+        session = None
+        if pooled:
+            session_path = self.get_obex_session(device_address, profile)
+            if not session_path:
+                transfer.finish("error")
+                return
+            session = self.obex_sessions[device_address]
+            session["active"] += 1
+        transfer.session_path = session_path
+
+        def release_session():
+            if session is not None:
+                session["active"] -= 1
+                session["last_used"] = time.monotonic()
+
+        def on_started(transfer_path, properties):
+            self.obex_transfers_starting -= 1
+            transfer.attach(transfer_path, properties)
+            self.obex_transfers[transfer.path] = transfer
             self.log.info("Started transfer: %s", transfer_path)
 
-            self.transfer_status = {"status": "unknown"}
-            self.session_bus.add_signal_receiver(
-                self.obex_properties_changed,
+            def on_finished(_):
+                self.obex_transfers.pop(transfer.path, None)
+                release_session()
+                self.unwatch_obex_transfers()
+            transfer.future.add_done_callback(on_finished)
+
+        def on_error(error):
+            self.obex_transfers_starting -= 1
+            release_session()
+            if pooled and retry and error.get_dbus_name() == "org.freedesktop.DBus.Error.UnknownObject":
+                # obexd drops sessions when the link goes down; start a fresh one once.
+                self.log.info("Pooled OBEX session %s is gone, reconnecting", session_path)
+                current = self.obex_sessions.get(device_address)
+                if current is not None and current["path"] == session_path:
+                    # Only the first failed transfer drops the entry; the others reuse its replacement.
+                    del self.obex_sessions[device_address]
+                self.start_obex_transfer(transfer, device_address, None, profile, retry=False)
+                return
+            self.log.info("OBEX send failed: %s", error)
+            transfer.finish("error")
+            self.unwatch_obex_transfers()
+
+        self.watch_obex_transfers()
+        opp_interface = dbus.Interface(
+            self.get_session_bus().get_object(constants.obex_service, session_path, introspect=False),
+            constants.obex_object_push
+        )
+        self.obex_transfers_starting += 1
+        try:
+            opp_interface.SendFile(transfer.file_path, reply_handler=on_started, error_handler=on_error)
+        except dbus.exceptions.DBusException as error:
+            on_error(error)
+
+    def watch_obex_transfers(self):
+        """Subscribe to Transfer1 PropertiesChanged while transfers are in flight."""
+        if self.obex_transfer_match is None:
+            self.obex_transfer_match = self.get_session_bus().add_signal_receiver(
+                self.on_obex_transfer_changed,
                 dbus_interface=constants.properties_interface,
                 signal_name="PropertiesChanged",
+                bus_name=constants.obex_service,
                 arg0=constants.obex_object_transfer,
-                path=transfer_path,
                 path_keyword="path"
             )
 
-            self.transfer_loop = GLib.MainLoop()
-            self.transfer_loop.run()
+    def unwatch_obex_transfers(self):
+        """Drop the Transfer1 signal subscription once no transfer is in flight or starting."""
+        if self.obex_transfer_match is not None and not self.obex_transfers and not self.obex_transfers_starting:
+            self.obex_transfer_match.remove()
+            self.obex_transfer_match = None
 
-            status = self.transfer_status["status"]
-            #self.remove_obex_session(session_path)
-            return status
+    def on_obex_transfer_changed(self, interface, changed, invalidated, path):
+        """Handle the PropertiesChanged signal for an OBEX file transfer.
 
-        except Exception as error:
-            self.log.info("OBEX send failed: %s", error)
-            return "error"
+        Args:
+            interface: The D-Bus interface name where the property change occurred.
+            changed: A dictionary containing the properties that changed and their new values.
+            invalidated: A list of properties that are no longer valid.
+            path: The D-Bus object path for the signal.
+        """
+        transfer = self.obex_transfers.get(str(path))
+        if transfer is None:
+            return
+        if "Status" in changed:
+            self.log.info("Signal: Transfer status changed to:%s", changed["Status"])
+        transfer.update(changed)
+
+    def cancel_transfer(self, transfer):
+        """Ask obexd to cancel an in-flight transfer; its future resolves with "cancelled"."""
+        if transfer.path is None or transfer.future.done():
+            return
+        transfer_interface = dbus.Interface(
+            self.get_session_bus().get_object(constants.obex_service, transfer.path, introspect=False),
+            constants.obex_object_transfer
+        )
+        transfer_interface.Cancel(reply_handler=lambda: None,
+                                  error_handler=lambda error: self.log.warning("Cancel failed: %s", error))
+
+    def start_opp_server(self, save_directory="/tmp"):
+        """Start a persistent OPP receive server that accepts any number of incoming files.
+
+        Args:
+            save_directory: Directory to save received files. Defaults to "/tmp".
+
+        Returns:
+            The running OppReceiveServer; received files are read from its queue
+            with server.get(timeout) or receive_file().
+        """
+        if self.opp_server is not None and self.opp_server.is_running():
+            return self.opp_server
+        run(self.log, "killall -9 obexpushd")
+        self.log.info("Killed existing obexpushd processes..")
+        self.opp_server = OppReceiveServer(save_directory, self.log)
+        self.opp_server.start()
+        return self.opp_server
 
     def receive_file(self, save_directory="/tmp", timeout=20, user_confirm_callback=None):
-        """Start an OBEX Object Push server and wait for a file to be received.
+        """Wait for one file from the OPP receive server.
+
+        If start_opp_server is running, the next file from its queue is taken and the
+        server keeps running; otherwise a server is started for this one file and
+        stopped afterwards.
 
         Args:
             save_directory: Directory to save received files. Defaults to "/tmp".
@@ -465,65 +898,39 @@ class BluetoothDeviceManager:
         Returns:
             Full path of accepted received file, or None if no file accepted
         """
+        persistent = self.opp_server is not None and self.opp_server.is_running()
         try:
-            if not os.path.exists(save_directory):
-                os.makedirs(save_directory)
-            run(self.log, "killall -9 obexpushd")
-            self.log.info("Killed existing obexpushd processes..")
-            existing_files = set(os.listdir(save_directory))
-            self.opp_process = subprocess.Popen(["obexpushd", "-B", "-o", save_directory, "-n"])
-            self.log.info("OPP server started. Waiting for incoming file...")
-            start_time = time.time()
-            while time.time() - start_time < timeout:
-                current_files = set(os.listdir(save_directory))
-                new_files = current_files - existing_files
-                if new_files:
-                    received_file = new_files.pop()
-                    full_path = os.path.join(save_directory, received_file)
-                    self.log.info("Incoming file: %s", received_file)
-                    user_accepted = True
-                    if user_confirm_callback:
-                        user_accepted = user_confirm_callback(full_path)
-                    if user_accepted:
-                        self.log.info("User accepted file.")
-                        self.stop_opp_receiver()
-                        return full_path
-                    else:
-                        self.log.info("User rejected file.")
-                        os.remove(full_path)
-                        self.stop_opp_receiver()
+            server = self.opp_server if persistent else self.start_opp_server(save_directory)
+            self.log.info("Waiting for incoming file...")
+            record = server.get(timeout)
+            if record is None:
+                self.log.info("No file received within %s seconds", timeout)
+                return None
+            full_path = record["path"]
+            self.log.info("Incoming file: %s", record["name"])
+            user_accepted = True
+            if user_confirm_callback:
+                user_accepted = user_confirm_callback(full_path)
+            if user_accepted:
+                self.log.info("User accepted file.")
+                return full_path
+            self.log.info("User rejected file.")
+            os.remove(full_path)
+            return None
         except Exception as error:
-            self.stop_opp_receiver()
             self.log.error("Error in receive_file:%s", error)
+        finally:
+            if not persistent:
+                self.stop_opp_receiver()
 
     def stop_opp_receiver(self):
         """Stop the OBEX Object Push server if it's currently running."""
-        if self.opp_process and self.opp_process.poll() is None:
-            self.opp_process.terminate()
-            self.opp_process.wait()
-            self.log.info("OPP server stopped.")
+        if self.opp_server is not None:
+            self.opp_server.stop()
+            self.opp_server = None
         else:
             self.log.info("No OPP server running or already stopped.")
 
-    def obex_properties_changed(self, interface, changed, invalidated, path):
-        """Handle the PropertiesChanged signal for an OBEX file transfer.
-
-        Args:
-            interface: The D-Bus interface name where the property change occurred.
-            changed: A dictionary containing the properties that changed and their new values.
-            invalidated: A list of properties that are no longer valid.
-            path: The D-Bus object path for the signal.
-        """
-        if "Status" in changed:
-            status = str(changed["Status"])
-            self.log.info("Signal: Transfer status changed to:%s", status)
-            self.transfer_status["status"] = status
-            if status in ["complete", "error", "cancelled"]:
-                if hasattr(self, "transfer_loop") and self.transfer_loop.is_running():
-                    self.transfer_loop.quit()
-            else:
-                self.log.warning("PropertiesChanged received without 'Status': %s", changed)
-
     def set_discoverable_mode(self, enable):
         """
         Makes the Bluetooth device discoverable.
@@ -542,6 +949,25 @@ class BluetoothDeviceManager:
             subprocess.run(command, shell=True)
             self.log.info("Bluetooth device is now non-discoverable.")
 
+    def get_session_bus(self):
+        """Return the session bus connection used for obexd, connecting on first use."""
+        if self.session_bus is None:
+            self.session_bus = dbus.SessionBus()
+        return self.session_bus
+
+    def get_obex_manager(self):
+        """Return the org.bluez.obex Client1 interface, created on first use.
+
+        The proxy follows the bus name rather than obexd's unique name, so it keeps
+        working after obexd restarts.
+        """
+        if self.obex_manager is None:
+            self.obex_manager = dbus.Interface(
+                self.get_session_bus().get_object(constants.obex_service, constants.obex_path,
+                                                  follow_name_owner_changes=True),
+                constants.obex_client)
+        return self.obex_manager
+
     def create_obex_session(self, device_address, profile):
         """Creates an OBEX Object Push (OPP) session.
 
@@ -553,15 +979,67 @@ class BluetoothDeviceManager:
             session_path: The OBEX session path if successful.
         """
         try:
-            self.session_bus = dbus.SessionBus()
-            self.obex_manager = dbus.Interface(self.session_bus.get_object(constants.obex_service, constants.obex_path), constants.obex_client)
-            session_path = self.obex_manager.CreateSession(device_address, {"Target": dbus.String(profile)})
+            session_path = self.get_obex_manager().CreateSession(device_address, {"Target": dbus.String(profile)})
             self.log.info("Created OBEX OPP session: %s", session_path)
             return session_path
         except Exception as error:
             self.log.error("OBEX session creation failed for device %s: %s", device_address, error)
             return False
 
+    def get_obex_session(self, device_address, profile="opp"):
+        """Return the pooled OBEX session of a device, creating it when needed.
+
+        Pooled sessions are removed after obex_session_idle_timeout seconds without use.
+
+        Args:
+            device_address: Bluetooth address of remote device.
+            profile: The bluetooth profile to use for the session.
+
+        Returns:
+            The OBEX session path, or False if it could not be created.
+        """
+        session = self.obex_sessions.get(device_address)
+        if session is not None and session["profile"] != profile:
+            self.release_obex_session(device_address)
+            session = None
+        if session is None:
+            session_path = self.create_obex_session(device_address, profile)
+            if not session_path:
+                return False
+            session = {"path": session_path, "profile": profile, "active": 0}
+            self.obex_sessions[device_address] = session
+            if self.obex_evict_timer_id is None:
+                self.obex_evict_timer_id = GLib.timeout_add_seconds(
+                    max(1, self.obex_session_idle_timeout // 2), self.evict_idle_obex_sessions)
+        session["last_used"] = time.monotonic()
+        return session["path"]
+
+    def release_obex_session(self, device_address):
+        """Remove the pooled OBEX session of a device, if any."""
+        session = self.obex_sessions.pop(device_address, None)
+        if session is not None:
+            self.remove_obex_session(session["path"])
+
+    def evict_idle_obex_sessions(self):
+        """GLib timer callback: remove pooled sessions that have been idle too long."""
+        now = time.monotonic()
+        for device_address, session in list(self.obex_sessions.items()):
+            if not session["active"] and now - session["last_used"] >= self.obex_session_idle_timeout:
+                self.log.info("Evicting idle OBEX session of %s", device_address)
+                self.release_obex_session(device_address)
+        if self.obex_sessions:
+            return True
+        self.obex_evict_timer_id = None
+        return False
+
+    def close_obex_sessions(self):
+        """Remove every pooled OBEX session."""
+        for device_address in list(self.obex_sessions):
+            self.release_obex_session(device_address)
+        if self.obex_evict_timer_id is not None:
+            GLib.source_remove(self.obex_evict_timer_id)
+            self.obex_evict_timer_id = None
+
     def remove_obex_session(self, session_path):
         """Removes the given OBEX session.
 
@@ -569,7 +1047,7 @@ class BluetoothDeviceManager:
             session_path: The OBEX session path to be removed.
         """
         try:
-            self.obex_manager.RemoveSession(session_path)
+            self.get_obex_manager().RemoveSession(session_path)
             self.log.info("Removed OBEX session: %s", session_path)
         except Exception as error:
             self.log.warning("Failed to remove session: %s", error)
@@ -584,26 +1062,24 @@ class BluetoothDeviceManager:
              status, track, position (ms), duration (ms), or None if unavailable.
         """
         try:
-            formatted_addr = address.replace(":", "_").upper()
-            for path, interfaces in self.object_manager.GetManagedObjects().items():
-                if constants.media_player_interface in interfaces:
-                    if formatted_addr in path and path.startswith(self.adapter_path):
-                        media_player = dbus.Interface(self.bus.get_object(constants.bluez_service, path), constants.media_player_interface)
-                        props = dbus.Interface(media_player, constants.properties_interface)
-                        status = props.Get(constants.media_player_interface, "Status")
-                        track = props.Get(constants.media_player_interface, "Track")
-                        position = props.Get(constants.media_player_interface, "Position")
-                        duration = track.get("Duration", 0)
-                        return {
-                            "status": str(status),
-                            "track": {
-                                "title": str(track.get("Title", "")),
-                                "artist": str(track.get("Artist", "")),
-                                "album": str(track.get("Album", "")),
-                            },
-                            "position": int(position),
-                            "duration": int(duration)
-                        }
+            path = self.object_cache.find_device_interface(self.adapter_path, address, constants.media_player_interface)
+            if path:
+                media_player = dbus.Interface(self.bus.get_object(constants.bluez_service, path), constants.media_player_interface)
+                props = dbus.Interface(media_player, constants.properties_interface)
+                status = props.Get(constants.media_player_interface, "Status")
+                track = props.Get(constants.media_player_interface, "Track")
+                position = props.Get(constants.media_player_interface, "Position")
+                duration = track.get("Duration", 0)
+                return {
+                    "status": str(status),
+                    "track": {
+                        "title": str(track.get("Title", "")),
+                        "artist": str(track.get("Artist", "")),
+                        "album": str(track.get("Album", "")),
+                    },
+                    "position": int(position),
+                    "duration": int(duration)
+                }
         except Exception as error:
             self.log.warning("Failed to get media playback info: %s", error)
 
@@ -617,14 +1093,14 @@ class BluetoothDeviceManager:
             The volume level as an integer if available, otherwise None.
         """
         try:
-            formatted_addr = address.replace(":", "_").upper()
-            for path, interfaces in self.object_manager.GetManagedObjects().items():
-                if constants.media_transport_interface in interfaces:
-                    if formatted_addr in path and path.startswith(self.adapter_path):
-                        transport = dbus.Interface(self.bus.get_object(constants.bluez_service, path),
-                                                   constants.properties_interface)
-                        volume = transport.Get(constants.media_transport_interface, "Volume")
-                        return int(volume)
+            path = self.object_cache.find_device_interface(self.adapter_path, address, constants.media_transport_interface)
+            if path:
+                volume = self.object_cache.get_properties(path, constants.media_transport_interface).get("Volume")
+                if volume is None:
+                    transport = dbus.Interface(self.bus.get_object(constants.bluez_service, path),
+                                               constants.properties_interface)
+                    volume = transport.Get(constants.media_transport_interface, "Volume")
+                return int(volume)
         except Exception as error:
             self.log.warning("Failed to get volume: %s", error)
         return None
@@ -640,14 +1116,12 @@ class BluetoothDeviceManager:
             True if the volume was set successfully, otherwise False.
         """
         try:
-            formatted_addr = address.replace(":", "_").upper()
-            for path, interfaces in self.object_manager.GetManagedObjects().items():
-                if constants.media_transport_interface in interfaces:
-                    if formatted_addr in path and path.startswith(self.adapter_path):
-                        transport = dbus.Interface(self.bus.get_object(constants.bluez_service, path), constants.properties_interface)
-                        transport.Set(constants.media_transport_interface, "Volume", dbus.UInt16(volume))
-                        self.log.info("Volume set to %d", volume)
-                        return True
+            path = self.object_cache.find_device_interface(self.adapter_path, address, constants.media_transport_interface)
+            if path:
+                transport = dbus.Interface(self.bus.get_object(constants.bluez_service, path), constants.properties_interface)
+                transport.Set(constants.media_transport_interface, "Volume", dbus.UInt16(volume))
+                self.log.info("Volume set to %d", volume)
+                return True
         except Exception as error:
             self.log.warning("Failed to set volume: %s", error)
         return False
@@ -664,10 +1138,8 @@ class BluetoothDeviceManager:
             Returns an empty list if the UUIDs cannot be retrieved.
         """
         device_path = self.get_device_path(device_address)
-        device = dbus.Interface(self.bus.get_object(constants.bluez_service, device_path), constants.device_interface)
-        properties = dbus.Interface(self.bus.get_object(constants.bluez_service, device_path),
-                                    constants.properties_interface)
         try:
+            properties = self.get_device_interface(device_path, constants.properties_interface)
             uuids = properties.Get(constants.device_interface, 'UUIDs')
             return uuids
         except Exception as error:
@@ -687,8 +1159,7 @@ class BluetoothDeviceManager:
         """
         device_path = self.get_device_path(address)
         try:
-            device = dbus.Interface(self.bus.get_object(constants.bluez_service, device_path),
-                                    constants.device_interface)
+            device = self.get_device_interface(device_path, constants.device_interface)
             device.ConnectProfile(profile_uuid)
             self.log.info("Profile %s successfully connected to %s", profile_uuid, address)
             return True
@@ -1041,76 +1512,325 @@ class BluetoothDeviceManager:
 
         )
 
+        application = self.application
+
         def app_registered():
+            if self.application is not application:
+                # Stopped while registration was pending.
+                return
+            self.is_registering = False
             self.is_server_running = True
+            application.registered = True
             self.log.info("GATT application registered")
+            if self.gatt_reregister_pending:
+                # A service was added while BlueZ was reading the tree.
+                self.gatt_reregister_pending = False
+                self.reregister_gatt_application()
 
         def app_register_error(error):
+            if self.application is application:
+                self.is_registering = False
+                self.gatt_reregister_pending = False
             self.log.error(f"Failed to register application: {error}")
 
-        service_manager.RegisterApplication(self.application.get_path(), {}, reply_handler=app_registered,
+        self.is_registering = True
+        service_manager.RegisterApplication(application.get_path(), {}, reply_handler=app_registered,
                                             error_handler=app_register_error)
 
-    def create_gatt_server(self, service_name):
+    def reregister_gatt_application(self):
+        """Unregister the application and register it again so BlueZ sees added services.
 
-        if service_name.startswith("Battery Service"):
-            primary_service = BatteryService(self.bus, 0, self.mainloop)
+        BlueZ reads the services of an application only on RegisterApplication; later
+        InterfacesAdded signals are ignored (only removals are applied).
+        """
+        service_manager = self.get_device_interface(self.adapter_path, constants.gatt_manager_interface)
+        application = self.application
 
-        elif service_name.startswith("Scan Parameters Service"):
-            primary_service = ScanParametersService(self.bus, 0, self.mainloop)
+        def app_unregistered():
+            if self.application is application:
+                self.register_gatt_application()
 
-        elif service_name.startswith("Find Me Service"):
-            primary_service = FindMeService(self.bus, 0, self.mainloop)
+        def app_unregister_error(error):
+            if self.application is not application:
+                return
+            self.log.warning(f"Failed to unregister application before re-registering: {error}")
+            self.register_gatt_application()
 
-        elif service_name.startswith("Health Thermometer Service"):
-            primary_service = HealthThermometerService(self.bus, 0 , self.mainloop)
-        else:
-            self.log.error(f"Unknown service: {service_name}")
-            return
+        self.log.info("Re-registering GATT application to publish added services")
+        self.is_server_running = False
+        self.is_registering = True
+        application.registered = False
+        try:
+            service_manager.UnregisterApplication(application.get_path(), reply_handler=app_unregistered,
+                                                  error_handler=app_unregister_error)
+        except dbus.exceptions.DBusException as error:
+            app_unregister_error(error)
+
+    def register_service_spec(self, service_name, spec):
+        """Make a declarative GATT service spec available to create_gatt_server by name.
+
+        Args:
+            service_name: Name used to select the service (matched by prefix).
+            spec: Spec dictionary, or path to a JSON/YAML file (see test_gatt_server.build_service).
+        """
+        self.service_specs[service_name] = spec
+
+    def set_service_options(self, service_name, **options):
+        """Set keyword arguments passed to a built-in service when it is created.
+
+        Args:
+            service_name: Built-in service name (a key of constants.gatt_service_specs
+                or constants.gatt_service_classes).
+            **options: Spec function or constructor keyword arguments, e.g. acquire_notify=True
+                for the Battery Service, or stress_mode=True for the Health Thermometer Service.
+        """
+        self.service_options[service_name] = options
+
+    def build_gatt_service(self, service, index):
+        """Create the service object for a name, a registered spec name or an inline spec.
+
+        Args:
+            service: Service name, or a spec dictionary.
+            index: Service index used for the object path.
+
+        Returns:
+            The service object, or None if the name is unknown.
+        """
+        if isinstance(service, dict):
+            return build_service(self.bus, index, service)
+        for name, spec in self.service_specs.items():
+            if service.startswith(name):
+                return build_service(self.bus, index, spec)
+        for name, spec_name in constants.gatt_service_specs.items():
+            if service.startswith(name):
+                options = self.service_options.get(name, {})
+                return build_service(self.bus, index, getattr(test_gatt_server, spec_name)(**options))
+        for name, class_name in constants.gatt_service_classes.items():
+            if service.startswith(name):
+                options = self.service_options.get(name, {})
+                return getattr(test_gatt_server, class_name)(self.bus, index, self.mainloop, **options)
+        return None
+
+    def create_gatt_server(self, service_name):
+        """Add a service to the GATT application, registering the application on first use.
+
+        Several services can be hosted at once; each gets its own object path. BlueZ
+        only picks up services when the application is registered, so adding a service
+        to a registered application re-registers it (see reregister_gatt_application).
+
+        Args:
+            service_name: Service name, registered spec name, or inline spec dictionary.
+
+        Returns:
+            The hosted service object, or None if the service is unknown.
+        """
+        key = service_name if isinstance(service_name, str) else service_name.get("name", service_name["uuid"])
+        if key in self.gatt_services:
+            self.log.info(f"Service already hosted: {key}")
+            return self.gatt_services[key]
 
         if self.application is None:
             self.setup_application()
 
+        primary_service = self.build_gatt_service(service_name, self.application.allocate_index())
+        if primary_service is None:
+            self.log.error(f"Unknown service: {service_name}")
+            return None
+
         self.application.add_service(primary_service)
-        self.register_gatt_application()
+        self.gatt_services[key] = primary_service
+        if self.is_registering:
+            # BlueZ may already have read the tree for the pending registration.
+            self.gatt_reregister_pending = True
+        elif self.is_server_running:
+            self.reregister_gatt_application()
+        else:
+            self.register_gatt_application()
+        return primary_service
 
-    def setup_advertisement(self, service_uuid):
-        """Ensures the Bluetooth agent object is created and ready."""
-        self.advertisement = Advertisement(self.bus, service_uuid)
+    def remove_gatt_service(self, service_name):
+        """Remove one hosted service while the other services stay registered.
+
+        Args:
+            service_name: Name (or spec name/UUID) the service was created with.
+
+        Returns:
+            True if the service was removed, False if it was not hosted.
+        """
+        service = self.gatt_services.pop(service_name, None)
+        if service is None or self.application is None:
+            self.log.info(f"Service not hosted: {service_name}")
+            return False
+        self.application.remove_service(service)
+        self.log.info(f"Removed service: {service_name}")
+        return True
+
+    def setup_advertisement(self, service_uuid, **options):
+        """Create the advertisement object (see test_gatt_server.Advertisement for options)."""
+        self.advertisement = Advertisement(self.bus, service_uuid, **options)
 
     def setup_application(self):
         """Ensures the Bluetooth agent object is created and ready."""
         self.application = Application(self.bus)
 
 
-    def start_advertising(self, service_uuid):
-            """Registers the advertisement object to start broadcasting."""
-            if self.advertisement is None:
-                self.setup_advertisement(service_uuid)
+    def is_loop_dispatching(self):
+        """Return True if a GLib loop delivers D-Bus signals to this manager right now.
 
-            advertisement_manager = dbus.Interface(
-                self.bus.get_object(constants.bluez_service, self.adapter_path),
-                constants.le_advertising_manager_interface
-            )
+        That is the case for hosts that declared external_loop, while mainloop (or
+        start_mainloop_thread) runs, and inside any callback dispatched by a GLib loop.
+        """
+        return self.external_loop or self.mainloop.is_running() or GLib.main_depth() > 0
 
-            def adv_registered():
-                self.is_advertising = True
-                self.log.info("Advertisement registered")
+    def start_mainloop_thread(self):
+        """Run the GLib main loop in a daemon thread so D-Bus replies and signals are dispatched.
 
-            def adv_register_error(error):
-                self.log.error(f"Failed to register advertisement: {error}")
-                self.advertisement = None
+        Only for hosts with no GLib loop of their own (scripts, benchmarks). Hosts that
+        already iterate the default context, such as the Qt GUI through its GLib event
+        dispatcher, pass external_loop=True instead: a second thread running the same
+        context would starve theirs. While the thread runs it owns the manager's state,
+        so other threads should go through run_in_loop and wait on futures.
 
-            advertisement_manager.RegisterAdvertisement(self.advertisement.get_path(), {}, reply_handler=adv_registered,
-                                                        error_handler=adv_register_error)
+        Returns:
+            The loop thread, or None if the host runs its own loop.
+        """
+        if self.external_loop:
+            self.log.warning("Host runs its own GLib loop; not starting a loop thread.")
+            return None
+        if self.mainloop_thread is not None and self.mainloop_thread.is_alive():
+            return self.mainloop_thread
+        if self.mainloop.is_running():
+            return None
+        self.mainloop_thread = threading.Thread(target=self.mainloop.run, name="bluez-mainloop", daemon=True)
+        self.mainloop_thread.start()
+        return self.mainloop_thread
+
+    def stop_mainloop_thread(self):
+        """Quit the loop started by start_mainloop_thread and wait for its thread to exit."""
+        if self.mainloop_thread is None:
+            return
+        self.mainloop.quit()
+        self.mainloop_thread.join()
+        self.mainloop_thread = None
+
+    def run_in_loop(self, function, *args, **kwargs):
+        """Call a manager method on the thread that dispatches the GLib loop.
+
+        Runs the call directly when no loop thread is running or when already on it.
 
-            self.mainloop.run()
+        Args:
+            function: Callable to invoke.
+            *args: Positional arguments for the callable.
+            **kwargs: Keyword arguments for the callable.
+
+        Returns:
+            concurrent.futures.Future resolved with the callable's return value.
+        """
+        future = Future()
+        future.set_running_or_notify_cancel()
+
+        def call():
+            try:
+                future.set_result(function(*args, **kwargs))
+            except Exception as error:
+                future.set_exception(error)
+            return False
+
+        thread = self.mainloop_thread
+        if thread is None or not thread.is_alive() or threading.current_thread() is thread:
+            call()
+        else:
+            GLib.idle_add(call)
+        return future
+
+    def remove_advertisement_object(self, advertisement):
+        """Unexport an advertisement object, ignoring objects that are already gone."""
+        try:
+            advertisement.remove_from_connection(self.bus, advertisement.get_path())
+        except Exception as error:
+            self.log.warning(f"Error removing advertisement object: {error}")
+
+    def start_advertising(self, service_uuid, **options):
+        """Register the advertisement object to start broadcasting, without blocking.
+
+        The registration completes on whichever loop dispatches D-Bus replies (the
+        caller's GLib loop, start_mainloop_thread, or wait_for_future).
+
+        Args:
+            service_uuid: Service UUID to advertise.
+            **options: Payload options such as manufacturer_data, service_data,
+                min_interval/max_interval, duration/timeout and secondary_channel.
+
+        Returns:
+            Future resolved with True once BlueZ accepted the advertisement, False on failure.
+            While a registration is pending, further calls return that registration's future.
+        """
+        if self.advertisement_registration is not None:
+            self.log.info("Advertisement registration is already pending.")
+            return self.advertisement_registration
+        future = Future()
+        future.set_running_or_notify_cancel()
+        if self.is_advertising:
+            self.log.info("Advertising is already running.")
+            future.set_result(True)
+            return future
+
+        # Only an advertisement created here is torn down if BlueZ rejects it.
+        created = self.advertisement is None
+        if created:
+            try:
+                self.setup_advertisement(service_uuid, **options)
+            except ValueError as error:
+                self.log.error(f"Invalid advertisement: {error}")
+                future.set_result(False)
+                return future
+        advertisement = self.advertisement
+
+        advertisement_manager = dbus.Interface(
+            self.bus.get_object(constants.bluez_service, self.adapter_path),
+            constants.le_advertising_manager_interface
+        )
+
+        def adv_registered():
+            if self.advertisement_registration is future:
+                self.advertisement_registration = None
+            self.is_advertising = True
+            self.log.info("Advertisement registered")
+            future.set_result(True)
+
+        def adv_register_error(error):
+            if self.advertisement_registration is future:
+                self.advertisement_registration = None
+            self.log.error(f"Failed to register advertisement: {error}")
+            if created:
+                if self.advertisement is advertisement:
+                    self.advertisement = None
+                self.remove_advertisement_object(advertisement)
+            future.set_result(False)
+
+        self.advertisement_registration = future
+        try:
+            advertisement_manager.RegisterAdvertisement(advertisement.get_path(), {}, reply_handler=adv_registered,
+                                                        error_handler=adv_register_error)
+        except dbus.exceptions.DBusException as error:
+            adv_register_error(error)
+        return future
 
     def stop_advertising(self):
-        """Unregisters the advertisement object to stop broadcasting."""
+        """Unregister the advertisement object to stop broadcasting, without blocking.
+
+        The object is unexported right away, so start_advertising can be called again
+        immediately without waiting for BlueZ to reply.
+
+        Returns:
+            Future resolved with True once BlueZ confirmed the unregistration, False otherwise.
+        """
+        future = Future()
+        future.set_running_or_notify_cancel()
         if not self.is_advertising or not self.advertisement:
             self.log.info("Advertising is already stopped.")
-            return
+            future.set_result(True)
+            return future
 
         old_advertisement = self.advertisement
         self.advertisement = None
@@ -1123,19 +1843,11 @@ class BluetoothDeviceManager:
 
         def adv_unregistered():
             self.log.info("Advertisement stopped successfully.")
-
-            try:
-                old_advertisement.remove_from_connection(self.bus, old_advertisement.get_path())
-            except Exception as error:
-                self.log.warning(f"Error removing advertisement object: {error}")
+            future.set_result(True)
 
         def adv_unregister_error(error):
             self.log.error(f"Failed to stop advertisement: {error}")
-
-            try:
-                old_advertisement.remove_from_connection(self.bus, old_advertisement.get_path())
-            except Exception as error:
-                self.log.warning(f"Error removing advertisement object after failure: {error}")
+            future.set_result(False)
 
         try:
             advertisement_manager.UnregisterAdvertisement(
@@ -1145,77 +1857,218 @@ class BluetoothDeviceManager:
             )
         except dbus.exceptions.DBusException as error:
             self.log.warning(f"Error unregistering advertisement: {error}")
+            future.set_result(False)
+        self.remove_advertisement_object(old_advertisement)
+        return future
+
+    def get_available_advertisement_instances(self):
+        """Return how many more advertisements the adapter can take.
+
+        BlueZ's SupportedInstances counts the free slots and goes down as sets are
+        registered (ActiveInstances counts the used ones).
+        """
+        properties = self.object_cache.get_properties(self.adapter_path, constants.le_advertising_manager_interface)
+        if properties and "SupportedInstances" in properties:
+            return int(properties["SupportedInstances"])
+        try:
+            return int(self.adapter_properties.Get(constants.le_advertising_manager_interface, "SupportedInstances"))
+        except dbus.exceptions.DBusException as error:
+            self.log.warning(f"Could not read SupportedInstances: {error}")
+            return 1
+
+    def add_advertisement(self, service_uuids, local_name="GATT_Test_Server", manufacturer_data=None, **options):
+        """Register one more advertisement set alongside the ones already broadcasting.
+
+        Args:
+            service_uuids: Service UUID or list of UUIDs to advertise.
+            local_name: Advertised local name.
+            manufacturer_data: Optional mapping of company ID to data bytes.
+            **options: Further payload options (see start_advertising).
+
+        Returns:
+            Future resolved with the advertisement instance number, or None if the adapter
+            has no free instance or BlueZ rejected the advertisement.
+        """
+        future = Future()
+        future.set_running_or_notify_cancel()
+        # Registrations still in flight are not reflected in SupportedInstances yet.
+        available = self.get_available_advertisement_instances() - self.advertisements_pending
+        if available <= 0:
+            self.log.warning(f"No free advertisement instance ({self.advertisements_pending} registration(s) pending)")
+            future.set_result(None)
+            return future
+
+        self.advertisement_instance += 1
+        index = self.advertisement_instance
+        try:
+            advertisement = Advertisement(self.bus, service_uuids, index, local_name, manufacturer_data, **options)
+        except ValueError as error:
+            self.log.error(f"Invalid advertisement: {error}")
+            future.set_result(None)
+            return future
+        self.advertisements[index] = advertisement
+
+        advertisement_manager = self.get_device_interface(self.adapter_path, constants.le_advertising_manager_interface)
+
+        def adv_registered():
+            self.advertisements_pending -= 1
+            self.log.info(f"Advertisement {index} registered")
+            future.set_result(index)
+
+        def adv_register_error(error):
+            self.advertisements_pending -= 1
+            self.log.error(f"Failed to register advertisement {index}: {error}")
+            self.advertisements.pop(index, None)
+            self.remove_advertisement_object(advertisement)
+            future.set_result(None)
+
+        self.advertisements_pending += 1
+        try:
+            advertisement_manager.RegisterAdvertisement(advertisement.get_path(), {}, reply_handler=adv_registered,
+                                                        error_handler=adv_register_error)
+        except dbus.exceptions.DBusException as error:
+            adv_register_error(error)
+        return future
+
+    def remove_advertisement(self, index):
+        """Unregister one advertisement set added with add_advertisement.
+
+        Args:
+            index: Advertisement instance number.
+
+        Returns:
+            Future resolved with True once BlueZ confirmed the unregistration, False otherwise.
+        """
+        future = Future()
+        future.set_running_or_notify_cancel()
+        self.stop_advertisement_rotation(index)
+        advertisement = self.advertisements.pop(index, None)
+        if advertisement is None:
+            future.set_result(True)
+            return future
+
+        advertisement_manager = self.get_device_interface(self.adapter_path, constants.le_advertising_manager_interface)
+
+        def adv_unregistered():
+            self.log.info(f"Advertisement {index} stopped")
+            future.set_result(True)
+
+        def adv_unregister_error(error):
+            self.log.error(f"Failed to stop advertisement {index}: {error}")
+            future.set_result(False)
+
+        try:
+            advertisement_manager.UnregisterAdvertisement(advertisement.get_path(), reply_handler=adv_unregistered,
+                                                          error_handler=adv_unregister_error)
+        except dbus.exceptions.DBusException as error:
+            adv_unregister_error(error)
+        self.remove_advertisement_object(advertisement)
+        return future
 
+    def remove_all_advertisements(self):
+        """Unregister every advertisement set added with add_advertisement.
+
+        Returns:
+            List of futures, one per advertisement.
+        """
+        return [self.remove_advertisement(index) for index in list(self.advertisements)]
+
+    def start_advertisement_rotation(self, index, variants, interval_ms):
+        """Cycle an advertisement through a list of payload variants.
+
+        Args:
+            index: Advertisement instance number.
+            variants: List of dicts of advertisement fields (service_uuids, local_name,
+                manufacturer_data, service_data, ...).
+            interval_ms: Time each variant stays on air, in milliseconds.
+
+        Returns:
+            True if the rotation was started, False if the advertisement does not exist.
+
+        Raises:
+            ValueError: If the first variant is not a valid payload.
+        """
+        advertisement = self.advertisements.get(index)
+        if advertisement is None or not variants:
+            return False
+        advertisement.update(**variants[0])
+        rotation = {"variants": list(variants), "position": 0}
+        self.advertisement_rotations[index] = rotation
+
+        def rotate():
+            if self.advertisements.get(index) is not advertisement:
+                return False
+            rotation["position"] = (rotation["position"] + 1) % len(rotation["variants"])
             try:
-                old_advertisement.remove_from_connection(self.bus, old_advertisement.get_path())
-            except Exception as error:
-                self.log.warning(f"Could not remove advertisement object: {error}")
+                advertisement.update(**rotation["variants"][rotation["position"]])
+            except ValueError as error:
+                self.log.warning(f"Skipping invalid advertisement variant: {error}")
+            return True
+
+        test_gatt_server.notification_scheduler.subscribe(("advertisement", index), interval_ms, rotate)
+        return True
+
+    def stop_advertisement_rotation(self, index):
+        """Stop cycling an advertisement; it keeps broadcasting its current payload."""
+        if self.advertisement_rotations.pop(index, None) is not None:
+            test_gatt_server.notification_scheduler.unsubscribe(("advertisement", index))
 
     def stop_gatt_server(self):
-        if not self.is_server_running:
-            self.log.info("Server is already stopped.")
-            return
+        """Unregister the GATT application and tear down everything it exported.
+
+        Timers, acquired sockets and sample sources are stopped and every exported
+        object is removed in one pass right after UnregisterApplication is issued,
+        so create_gatt_server can be called again immediately.
 
-        if self.application:
-            for service in self.application.services:
-                for char in service.get_characteristics():
-                    if hasattr(char, "StopNotify"):
-                        char.StopNotify()
+        Returns:
+            Future resolved with True once BlueZ confirmed the unregistration, False otherwise.
+        """
+        future = Future()
+        future.set_running_or_notify_cancel()
+        if self.application is None:
+            self.log.info("Server is already stopped.")
+            future.set_result(True)
+            return future
 
         self.stop_advertising()
         old_application = self.application
+        was_registered = old_application.registered or self.is_registering
         self.application = None
-        service_manager = dbus.Interface(
-            self.bus.get_object(constants.bluez_service, self.adapter_path),
-            constants.gatt_manager_interface
-        )
+        self.gatt_services = {}
+        self.is_server_running = False
+        self.is_registering = False
+        self.gatt_reregister_pending = False
 
         def app_unregistered():
             self.log.info("GATT application unregistered.")
-            self.is_server_running = False
-
-            try:
-                for service in old_application.services:
-                    for char in service.get_characteristics():
-
-                        if hasattr(char, "descriptor"):
-                            char.descriptor.remove_from_connection(self.bus, char.descriptor.get_path())
-
-                        char.remove_from_connection(self.bus, char.get_path())
-
-                    service.remove_from_connection(self.bus, service.get_path())
-            except Exception as error:
-                self.log.warning(f"Failed removing service or children: {error}")
-
-            try:
-                old_application.remove_from_connection(self.bus, old_application.get_path())
-            except Exception as error:
-                self.log.warning(f"Failed removing application object: {error}")
+            future.set_result(True)
 
         def app_unregister_error(error):
             self.log.error(f"Failed to unregister application: {error}")
-            self.is_server_running = False
+            future.set_result(False)
 
-        try:
-            service_manager.UnregisterApplication(
-                old_application.get_path(),
-                reply_handler=app_unregistered,
-                error_handler=app_unregister_error
-            )
-        except Exception as error:
-            self.log.warning(f"Error unregistering application: {error}")
+        if was_registered:
+            service_manager = self.get_device_interface(self.adapter_path, constants.gatt_manager_interface)
+            try:
+                service_manager.UnregisterApplication(
+                    old_application.get_path(),
+                    reply_handler=app_unregistered,
+                    error_handler=app_unregister_error
+                )
+            except dbus.exceptions.DBusException as error:
+                app_unregister_error(error)
+        else:
+            future.set_result(True)
+
+        old_application.shutdown()
+        return future
 
     def get_connected_devices(self):
         """Returns all currently connected devices."""
         connected = {}
 
-        for path, interfaces in self.object_manager.GetManagedObjects().items():
-            if constants.device_interface not in interfaces:
-                continue
-
-            device = interfaces[constants.device_interface]
-
-            if device.get("Connected", False) and device.get("Adapter") == self.adapter_path:
+        for path, device in self.object_cache.get_devices(self.adapter_path).items():
+            if device.get("Connected", False):
                 address = device.get("Address")
                 name = device.get("Name", "Unknown")
                 connected[address] = name
@@ -62,6 +62,18 @@ gatt_manager_interface = 'org.bluez.GattManager1'
 le_advertising_manager_interface = 'org.bluez.LEAdvertisingManager1'
 le_advertisement_interface = 'org.bluez.LEAdvertisement1'
 advertisement_path = '/org/bluez/example/advertisement'
+# Maps GATT server service names (as shown in the UI, matched by prefix) to service class names
+# in test_gatt_server. Services without a class are built from a spec with register_service_spec().
+# Built-in services described by a spec; each maps to a test_gatt_server function
+# returning the spec for test_gatt_server.build_service.
+gatt_service_specs = {
+    "Battery Service": "battery_service_spec",
+    "Scan Parameters Service": "scan_parameters_service_spec",
+}
+gatt_service_classes = {
+    "Find Me Service": "FindMeService",
+    "Health Thermometer Service": "HealthThermometerService",
+}
 '''scan_parameters_service_uuid = '00001813-0000-1000-8000-00805f9b34fb'
 scan_interval_window_uuid = '00002a4f-0000-1000-8000-00805f9b34fb'
 scan_refresh_uuid          = '00002a31-0000-1000-8000-00805f9b34fb'''''
@@ -6,6 +6,7 @@ from PyQt6.QtCore import QCoreApplication
 from PyQt6.QtCore import Qt
 from PyQt6.QtCore import QFileSystemWatcher
 from PyQt6.QtCore import QTimer
+from PyQt6.QtCore import pyqtSignal
 from PyQt6.QtGui import QColor
 from PyQt6.QtGui import QFont
 from PyQt6.QtWidgets import QCheckBox, QInputDialog
@@ -46,6 +47,13 @@ from Utils.utils import validate_bluetooth_address
 class TestApplication(QWidget):
     """Main GUI class for the Bluetooth Test Host."""
 
+    # Results of async BlueZ calls arrive from D-Bus callbacks that Qt's GLib event
+    # dispatcher runs; these signals hand them to the widget slots.
+    device_action_finished = pyqtSignal(str, str, str, bool, object)
+    advertising_finished = pyqtSignal(str, bool)
+    send_file_progress = pyqtSignal(int, float)
+    send_file_finished = pyqtSignal(str)
+
     def __init__(self, interface=None, back_callback=None, log=None, bluetoothd_log_file_path=None, pulseaudio_log_file_path=None, obexd_log_file_path=None, ofonod_log_file_path=None, hcidump_log_name=None):
         """Initialize the Test Host widget.
 
@@ -69,7 +77,11 @@ class TestApplication(QWidget):
         self.ofonod_log_file_path = ofonod_log_file_path
         self.hcidump_log_name = hcidump_log_name
         self.back_callback = back_callback
-        self.bluetooth_device_manager = BluetoothDeviceManager(log=self.log, interface=self.interface)
+        self.bluetooth_device_manager = BluetoothDeviceManager(log=self.log, interface=self.interface, external_loop=True)
+        self.device_action_finished.connect(self.handle_device_action_result)
+        self.advertising_finished.connect(self.handle_advertising_result)
+        self.send_file_progress.connect(self.update_send_file_progress)
+        self.send_file_finished.connect(self.handle_send_file_result)
         self.paired_devices = {}
         self.main_grid_layout = None
         self.gap_button = None
@@ -1074,17 +1086,35 @@ class TestApplication(QWidget):
     def send_file(self):
         """Send a selected file to a remote device using OPP."""
         file_path = self.opp_location_input.text()
-        session_path = self.bluetooth_device_manager.device_states.get(self.device_address, {}).get("session_path")
         if not file_path or not self.device_address:
             QMessageBox.warning(None, "OPP", "Please select a device and a file.")
             return
         self.send_file_button.setEnabled(False)
         self.send_file_button.setText("Sending...")
         try:
-            status = self.bluetooth_device_manager.send_file(self.device_address, file_path, session_path)
+            transfer = self.bluetooth_device_manager.send_file_async(
+                self.device_address, file_path,
+                progress_callback=lambda update: self.send_file_progress.emit(update.percent(), update.rate))
+            transfer.future.add_done_callback(lambda done: self.send_file_finished.emit(done.result()))
         except Exception as error:
-            status = "error"
             self.log.info("UI error:%s", error)
+            self.handle_send_file_result("error")
+
+    def update_send_file_progress(self, percent, rate):
+        """Show the progress of the running OPP send on the Send File button.
+
+        Args:
+            percent: Completed share of the file.
+            rate: Current throughput in bytes per second.
+        """
+        self.send_file_button.setText(f"Sending... {percent}% ({rate / 1024:.0f} KiB/s)")
+
+    def handle_send_file_result(self, status):
+        """Restore the Send File button and report the final transfer status.
+
+        Args:
+            status: Final OBEX transfer status.
+        """
         self.send_file_button.setEnabled(True)
         self.send_file_button.setText("Send File")
         if status == "complete":
@@ -1254,10 +1284,27 @@ class TestApplication(QWidget):
             self.log.error("Unknown action: %s", action)
             return
         method_name, response_handler = device_action
+        self.log.info("Performing %s on %s", method_name, device_address)
+        async_method = getattr(self.bluetooth_device_manager, f"{action}_async", None)
+        if async_method:
+            future = async_method(device_address)
+            future.add_done_callback(
+                lambda done: self.device_action_finished.emit(action, device_address, response_handler, load_profiles, done.result()))
+            return
         method = getattr(self.bluetooth_device_manager, method_name)
-        selected_profiles = {}
         result = method(device_address)
-        self.log.info("Performing %s on %s", method_name, device_address)
+        self.handle_device_action_result(action, device_address, response_handler, load_profiles, result)
+
+    def handle_device_action_result(self, action, device_address, response_handler, load_profiles, result):
+        """Log the outcome of a device action and refresh the UI through its response handler.
+
+        Args:
+            action: The action that was performed ("connect", "disconnect", "pair", "unpair").
+            device_address: The bluetooth address of the remote device.
+            response_handler: Name of the TestApplication method that refreshes the UI.
+            load_profiles: Indicates whether to load device profiles after a successful connect.
+            result: True if the action succeeded, False otherwise.
+        """
         if result:
             self.log.info(f"{device_address}: Device {action} successful.")
         else:
@@ -1271,7 +1318,7 @@ class TestApplication(QWidget):
             response_handler(device_address, profile_list)
         elif action == "unpair":
             response_handler(device_address)
-        elif action == "pair" and self.bluetooth_device_manager.is_device_paired(device_address):
+        elif action == "pair" and result:
             response_handler(device_address)
 
     def get_profile_selection_dialog(self):
@@ -2126,8 +2173,20 @@ class TestApplication(QWidget):
         elif service_choice.startswith("Health Thermometer"):
             uuid = "1809"
 
-        self.bluetooth_device_manager.start_advertising(uuid)
-        QMessageBox.information(self, "Advertising", f"Advertising {uuid} started.")
+        future = self.bluetooth_device_manager.start_advertising(uuid)
+        future.add_done_callback(lambda done: self.advertising_finished.emit(uuid, done.result()))
+
+    def handle_advertising_result(self, uuid, started):
+        """Report the outcome of an advertising request started by handle_advertising.
+
+        Args:
+            uuid: Advertised service UUID.
+            started: True if BlueZ registered the advertisement.
+        """
+        if started:
+            QMessageBox.information(self, "Advertising", f"Advertising {uuid} started.")
+        else:
+            QMessageBox.warning(self, "Advertising", f"Failed to start advertising {uuid}.")
 
 
     def update_connected_device_panel(self):
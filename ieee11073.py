@@ -0,0 +1,128 @@
+"""IEEE 11073-20601 32-bit FLOAT encoding, as used by the Health Thermometer service.
+
+A FLOAT is a 24-bit signed mantissa in the low bits and an 8-bit signed base-10
+exponent in the high byte, sent little-endian: three mantissa bytes (LSB first)
+followed by the exponent byte. The *_array functions encode or decode whole
+sample buffers in one call, vectorised with NumPy when it is installed.
+"""
+import array
+import math
+import struct
+import sys
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+FLOAT_NAN = 0x007FFFFF
+FLOAT_NRES = 0x00800000
+FLOAT_RESERVED = 0x00800001
+FLOAT_POSITIVE_INFINITY = 0x007FFFFE
+FLOAT_NEGATIVE_INFINITY = 0x00800002
+MANTISSA_MAX = 0x007FFFFD
+MANTISSA_MIN = -0x007FFFFD
+
+_SPECIAL_VALUES = {
+    FLOAT_NAN: math.nan,
+    FLOAT_NRES: math.nan,
+    FLOAT_RESERVED: math.nan,
+    FLOAT_POSITIVE_INFINITY: math.inf,
+    FLOAT_NEGATIVE_INFINITY: -math.inf,
+}
+_FLOAT_STRUCT = struct.Struct("<I")
+
+
+def float_to_raw(value, exponent=-2):
+    """Return the 32-bit FLOAT word for one value.
+
+    Args:
+        value: Value to encode.
+        exponent: Base-10 exponent; -2 keeps two decimals (0.01 resolution).
+
+    Returns:
+        Unsigned 32-bit integer holding exponent and mantissa.
+    """
+    if math.isnan(value):
+        return FLOAT_NAN
+    mantissa = round(value * 10 ** -exponent) if math.isfinite(value) else value
+    if mantissa > MANTISSA_MAX:
+        return FLOAT_POSITIVE_INFINITY
+    if mantissa < MANTISSA_MIN:
+        return FLOAT_NEGATIVE_INFINITY
+    return ((exponent & 0xFF) << 24) | (int(mantissa) & 0xFFFFFF)
+
+
+def raw_to_float(raw):
+    """Return the value of a 32-bit FLOAT word (NaN/NRes/Reserved decode to NaN)."""
+    mantissa = raw & 0xFFFFFF
+    if mantissa in _SPECIAL_VALUES:
+        return _SPECIAL_VALUES[mantissa]
+    if mantissa & 0x800000:
+        mantissa -= 0x1000000
+    exponent = (raw >> 24) & 0xFF
+    if exponent & 0x80:
+        exponent -= 0x100
+    return mantissa * 10.0 ** exponent
+
+
+def encode_float(value, exponent=-2):
+    """Encode one value as the 4 little-endian bytes of an IEEE-11073 FLOAT."""
+    return _FLOAT_STRUCT.pack(float_to_raw(value, exponent))
+
+
+def decode_float(data, offset=0):
+    """Decode the IEEE-11073 FLOAT stored at data[offset:offset + 4]."""
+    return raw_to_float(_FLOAT_STRUCT.unpack_from(data, offset)[0])
+
+
+def encode_float_array(values, exponent=-2):
+    """Encode a buffer of values into consecutive 4-byte IEEE-11073 FLOATs.
+
+    Args:
+        values: NumPy array, array.array or any iterable of numbers.
+        exponent: Base-10 exponent shared by every sample.
+
+    Returns:
+        bytes of length 4 * len(values).
+    """
+    if numpy is not None:
+        samples = numpy.asarray(values, dtype=numpy.float64)
+        with numpy.errstate(invalid="ignore", over="ignore"):
+            mantissa = numpy.rint(samples * 10.0 ** -exponent)
+            raw = ((exponent & 0xFF) << 24) | (numpy.nan_to_num(mantissa).astype(numpy.int64) & 0xFFFFFF)
+            raw = numpy.where(mantissa > MANTISSA_MAX, FLOAT_POSITIVE_INFINITY, raw)
+            raw = numpy.where(mantissa < MANTISSA_MIN, FLOAT_NEGATIVE_INFINITY, raw)
+        raw = numpy.where(numpy.isnan(samples), FLOAT_NAN, raw)
+        return raw.astype("<u4").tobytes()
+    raw = array.array("I", (float_to_raw(value, exponent) for value in values))
+    if sys.byteorder != "little":
+        raw.byteswap()
+    return raw.tobytes()
+
+
+def decode_float_array(data):
+    """Decode consecutive 4-byte IEEE-11073 FLOATs.
+
+    Args:
+        data: bytes-like object whose length is a multiple of 4.
+
+    Returns:
+        numpy.ndarray of float64 when NumPy is installed, else array.array('d').
+    """
+    if len(data) % 4:
+        raise ValueError(f"FLOAT buffer length must be a multiple of 4, got {len(data)}")
+    if numpy is not None:
+        raw = numpy.frombuffer(data, dtype="<u4").astype(numpy.int64)
+        mantissa = raw & 0xFFFFFF
+        exponent = ((raw >> 24) & 0xFF).astype(numpy.int8).astype(numpy.float64)
+        signed = numpy.where(mantissa & 0x800000, mantissa - 0x1000000, mantissa)
+        values = signed * numpy.power(10.0, exponent)
+        values = numpy.where(numpy.isin(mantissa, (FLOAT_NAN, FLOAT_NRES, FLOAT_RESERVED)), numpy.nan, values)
+        values = numpy.where(mantissa == FLOAT_POSITIVE_INFINITY, numpy.inf, values)
+        return numpy.where(mantissa == FLOAT_NEGATIVE_INFINITY, -numpy.inf, values)
+    raw = array.array("I")
+    raw.frombytes(bytes(data))
+    if sys.byteorder != "little":
+        raw.byteswap()
+    return array.array("d", (raw_to_float(word) for word in raw))
@@ -0,0 +1,583 @@
+"""OPP throughput benchmark against a local stand-in for org.bluez.obex.
+
+A private dbus-daemon serves as both the session and the system bus. This file,
+started again with --stand-in, owns org.bluez (one adapter, enough for
+BluetoothDeviceManager to initialise) and org.bluez.obex (Client1, ObjectPush1
+and Transfer1, reading the pushed file in chunks as obexd would). The receive
+side runs OppReceiveServer with a stand-in sender (--push-sender) in place of
+obexpushd that writes files at the simulated link rate, and reports when files
+arrive and how long receive_file takes to hand each one over. No radio is
+involved, so the numbers measure our OBEX code path.
+
+With --unpair N the stand-in also exports N paired devices, and unpair_many
+removes them four at a time before the loop thread starts, checking that every
+device is reported removed and dropped from the object cache and proxy pool.
+
+Usage:
+    python obex_benchmark.py --size 1048576 --count 20 [--rate BYTES_PER_S] [--unpair N] [--json]
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ADAPTER = "hci0"
+DEVICE_ADDRESS = "00:11:22:33:44:55"
+# Stand-in paired devices for --unpair are 00:11:22:33:45:01, :02, ...
+UNPAIR_ADDRESS_PREFIX = "00:11:22:33:45"
+BLUEZ_SERVICE = "org.bluez"
+OBEX_SERVICE = "org.bluez.obex"
+OBEX_PATH = "/org/bluez/obex"
+PROPERTIES_INTERFACE = "org.freedesktop.DBus.Properties"
+TRANSFER_INTERFACE = "org.bluez.obex.Transfer1"
+# Minimum time between Transferred updates, like obexd's progress throttling.
+PROGRESS_INTERVAL = 0.1
+
+
+def unpair_addresses(count):
+    """Return the addresses of the stand-in devices exported for --unpair."""
+    return [f"{UNPAIR_ADDRESS_PREFIX}:{index:02X}" for index in range(1, count + 1)]
+
+
+def run_stand_in(chunk_size, rate, devices=0):
+    """Serve the stand-in org.bluez and org.bluez.obex objects until terminated.
+
+    Args:
+        chunk_size: Bytes read from the pushed file per step.
+        rate: Simulated link rate in bytes per second, or 0 for as fast as possible.
+        devices: Number of paired Device1 objects exported under the adapter.
+    """
+    import dbus
+    import dbus.service
+    from collections import deque
+    from dbus.mainloop.glib import DBusGMainLoop
+    from gi.repository import GLib
+
+    DBusGMainLoop(set_as_default=True)
+    bus = dbus.SessionBus()
+
+    adapter_interfaces = {
+        "org.bluez.Adapter1": {"Address": "00:00:00:00:00:01", "Powered": True},
+        "org.bluez.LEAdvertisingManager1": {"SupportedInstances": dbus.Byte(4)},
+    }
+    device_objects = {}
+    for address in unpair_addresses(devices):
+        path = f"/org/bluez/{ADAPTER}/dev_{address.replace(':', '_')}"
+        device_objects[path] = {"org.bluez.Device1": {
+            "Address": address, "Adapter": dbus.ObjectPath(f"/org/bluez/{ADAPTER}"),
+            "Paired": True, "Connected": False}}
+
+    class ObjectManager(dbus.service.Object):
+        @dbus.service.method("org.freedesktop.DBus.ObjectManager", out_signature="a{oa{sa{sv}}}")
+        def GetManagedObjects(self):
+            managed_objects = {dbus.ObjectPath(f"/org/bluez/{ADAPTER}"): adapter_interfaces}
+            managed_objects.update((dbus.ObjectPath(path), interfaces) for path, interfaces in device_objects.items())
+            return managed_objects
+
+        @dbus.service.signal("org.freedesktop.DBus.ObjectManager", signature="oas")
+        def InterfacesRemoved(self, path, interfaces):
+            pass
+
+    class Adapter(dbus.service.Object):
+        @dbus.service.method(PROPERTIES_INTERFACE, in_signature="ss", out_signature="v")
+        def Get(self, interface, name):
+            try:
+                return adapter_interfaces[interface][name]
+            except KeyError:
+                raise dbus.exceptions.DBusException("org.freedesktop.DBus.Error.InvalidArgs", name)
+
+        @dbus.service.method(PROPERTIES_INTERFACE, in_signature="s", out_signature="a{sv}")
+        def GetAll(self, interface):
+            return adapter_interfaces.get(interface, {})
+
+        @dbus.service.method("org.bluez.Adapter1", in_signature="o")
+        def RemoveDevice(self, device):
+            interfaces = device_objects.pop(str(device), None)
+            if interfaces is None:
+                raise dbus.exceptions.DBusException("org.bluez.Error.DoesNotExist", "Does Not Exist")
+
+            # Signalled after the reply, as several removals may be in flight at once.
+            def signal_removed():
+                object_manager.InterfacesRemoved(device, dbus.Array(interfaces, signature="s"))
+                return False
+            GLib.idle_add(signal_removed)
+
+    class Transfer(dbus.service.Object):
+        def __init__(self, path, filename, session):
+            self.path = path
+            self.session = session
+            self.filename = filename
+            self.size = os.path.getsize(filename)
+            self.status = "queued"
+            self.transferred = 0
+            self.file = None
+            self.started = 0.0
+            self.last_progress = 0.0
+            dbus.service.Object.__init__(self, bus, path)
+
+        def properties(self):
+            return dbus.Dictionary({
+                "Status": self.status,
+                "Name": os.path.basename(self.filename),
+                "Size": dbus.UInt64(self.size),
+                "Filename": self.filename,
+                "Transferred": dbus.UInt64(self.transferred),
+            }, signature="sv")
+
+        def start(self):
+            self.file = open(self.filename, "rb")
+            self.status = "active"
+            self.started = self.last_progress = time.monotonic()
+            self.PropertiesChanged(TRANSFER_INTERFACE, {"Status": self.status}, [])
+
+        def next_step_delay(self):
+            """Return seconds until the next chunk is due at the simulated link rate."""
+            if not rate:
+                return 0
+            return max(0.0, self.started + (self.transferred + chunk_size) / rate - time.monotonic())
+
+        def step(self):
+            data = self.file.read(chunk_size)
+            self.transferred += len(data)
+            if data and self.transferred < self.size:
+                now = time.monotonic()
+                if now - self.last_progress >= PROGRESS_INTERVAL:
+                    self.last_progress = now
+                    self.PropertiesChanged(TRANSFER_INTERFACE, {"Transferred": dbus.UInt64(self.transferred)}, [])
+                return False
+            self.finish("complete")
+            return True
+
+        def finish(self, status):
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            self.status = status
+            self.PropertiesChanged(TRANSFER_INTERFACE, {"Status": status,
+                                                        "Transferred": dbus.UInt64(self.transferred)}, [])
+            GLib.idle_add(self.unexport)
+
+        def unexport(self):
+            self.remove_from_connection()
+            return False
+
+        @dbus.service.method(TRANSFER_INTERFACE)
+        def Cancel(self):
+            self.session.cancel(self)
+
+        @dbus.service.signal(PROPERTIES_INTERFACE, signature="sa{sv}as")
+        def PropertiesChanged(self, interface, changed, invalidated):
+            pass
+
+    class Session(dbus.service.Object):
+        def __init__(self, path):
+            self.path = path
+            self.queue = deque()
+            self.active = None
+            self.source_id = None
+            self.next_transfer = 0
+            dbus.service.Object.__init__(self, bus, path)
+
+        @dbus.service.method("org.bluez.obex.ObjectPush1", in_signature="s", out_signature="oa{sv}")
+        def SendFile(self, sourcefile):
+            if not os.path.exists(sourcefile):
+                raise dbus.exceptions.DBusException("org.bluez.obex.Error.InvalidArguments", sourcefile)
+            transfer = Transfer(f"{self.path}/transfer{self.next_transfer}", sourcefile, self)
+            self.next_transfer += 1
+            self.queue.append(transfer)
+            if self.source_id is None:
+                self.source_id = GLib.idle_add(self.pump)
+            return dbus.ObjectPath(transfer.path), transfer.properties()
+
+        def pump(self):
+            self.source_id = None
+            if self.active is None:
+                if not self.queue:
+                    return False
+                self.active = self.queue.popleft()
+                self.active.start()
+            elif self.active.step():
+                self.active = None
+            delay = self.active.next_step_delay() if self.active is not None else 0
+            if delay:
+                self.source_id = GLib.timeout_add(int(delay * 1000), self.pump)
+            else:
+                self.source_id = GLib.idle_add(self.pump)
+            return False
+
+        def cancel(self, transfer):
+            """End a queued or active transfer and move on to the next queued one."""
+            if transfer is self.active:
+                self.active = None
+                if self.source_id is not None:
+                    GLib.source_remove(self.source_id)
+                self.source_id = GLib.idle_add(self.pump)
+            elif transfer in self.queue:
+                self.queue.remove(transfer)
+            else:
+                raise dbus.exceptions.DBusException("org.bluez.obex.Error.NotInProgress", "Not in progress")
+            transfer.finish("cancelled")
+
+        def close(self):
+            if self.source_id is not None:
+                GLib.source_remove(self.source_id)
+                self.source_id = None
+            for transfer in ([self.active] if self.active else []) + list(self.queue):
+                transfer.finish("error")
+            self.remove_from_connection()
+
+    class ObexClient(dbus.service.Object):
+        def __init__(self):
+            self.sessions = {}
+            self.next_session = 0
+            dbus.service.Object.__init__(self, bus, OBEX_PATH)
+
+        @dbus.service.method("org.bluez.obex.Client1", in_signature="sa{sv}", out_signature="o")
+        def CreateSession(self, destination, args):
+            path = f"{OBEX_PATH}/client/session{self.next_session}"
+            self.next_session += 1
+            self.sessions[path] = Session(path)
+            return dbus.ObjectPath(path)
+
+        @dbus.service.method("org.bluez.obex.Client1", in_signature="o")
+        def RemoveSession(self, session):
+            session = self.sessions.pop(str(session), None)
+            if session is None:
+                raise dbus.exceptions.DBusException("org.bluez.obex.Error.NotAuthorized", "Unknown session")
+            session.close()
+
+    names = [dbus.service.BusName(BLUEZ_SERVICE, bus), dbus.service.BusName(OBEX_SERVICE, bus)]
+    object_manager = ObjectManager(bus, "/")
+    objects = [object_manager, Adapter(bus, f"/org/bluez/{ADAPTER}"), ObexClient()]
+    GLib.MainLoop().run()
+    return names, objects
+
+
+def run_push_sender(directory, size, count, chunk_size, rate):
+    """Stand in for obexpushd: receive count files of size bytes into directory, then idle.
+
+    Each file is created, written chunk by chunk and closed, producing the same
+    inotify events as obexpushd storing a pushed object.
+
+    Args:
+        directory: Directory to write the files into.
+        size: Bytes per file.
+        count: Number of files.
+        chunk_size: Bytes written per step.
+        rate: Simulated link rate in bytes per second, or 0 for as fast as possible.
+    """
+    payload = os.urandom(min(size, chunk_size))
+    start = time.monotonic()
+    written = 0
+    for index in range(count):
+        with open(os.path.join(directory, f"received_{index}.bin"), "wb") as received:
+            remaining = size
+            while remaining:
+                chunk = payload[:remaining]
+                written += len(chunk)
+                if rate:
+                    # Write each chunk when it would have arrived; pacing against the
+                    # start keeps sleep overshoot from accumulating.
+                    delay = start + written / rate - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                received.write(chunk)
+                received.flush()
+                remaining -= len(chunk)
+    # OppReceiveServer restarts its process if it exits, so stay alive until stopped.
+    while True:
+        time.sleep(3600)
+
+
+def start_private_bus():
+    """Start a private dbus-daemon and point both bus addresses at it.
+
+    Returns:
+        The dbus-daemon process.
+    """
+    daemon = subprocess.Popen(["dbus-daemon", "--session", "--nofork", "--print-address=1"],
+                              stdout=subprocess.PIPE, text=True)
+    address = daemon.stdout.readline().strip()
+    if not address:
+        daemon.kill()
+        raise RuntimeError("dbus-daemon did not report an address")
+    os.environ["DBUS_SESSION_BUS_ADDRESS"] = address
+    os.environ["DBUS_SYSTEM_BUS_ADDRESS"] = address
+    return daemon
+
+
+def wait_for_names(names, timeout=10):
+    """Block until every bus name is owned on the private bus.
+
+    Args:
+        names: Well-known bus names the stand-in claims.
+        timeout: Seconds to wait before giving up.
+
+    Raises:
+        RuntimeError: If a name is still unowned after the timeout.
+    """
+    import dbus
+
+    # A private connection: the shared one must first be created after bluez_gatt
+    # installs the GLib main loop as the default.
+    bus = dbus.SessionBus(private=True)
+    try:
+        deadline = time.monotonic() + timeout
+        while not all(bus.name_has_owner(name) for name in names):
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Stand-in did not claim {', '.join(names)}")
+            time.sleep(0.05)
+    finally:
+        bus.close()
+
+
+def summarize(durations, size):
+    """Return latency and throughput statistics for a list of per-transfer durations."""
+    total = sum(durations)
+    return {
+        "count": len(durations),
+        "min_ms": min(durations) * 1000,
+        "median_ms": statistics.median(durations) * 1000,
+        "mean_ms": statistics.mean(durations) * 1000,
+        "max_ms": max(durations) * 1000,
+        "mb_per_s": size * len(durations) / total / 1e6 if total else None,
+    }
+
+
+def benchmark_send(manager, payload_path, size, count, timeout):
+    """Measure session setup, one-at-a-time sends and sends queued on one session.
+
+    Manager calls are handed to its loop thread with run_in_loop, which owns the
+    session pool and transfer state while the benchmark waits on futures.
+    """
+    results = {}
+    start = time.monotonic()
+    session_path = manager.run_in_loop(manager.get_obex_session, DEVICE_ADDRESS).result(timeout)
+    results["session_setup_ms"] = (time.monotonic() - start) * 1000
+    if not session_path:
+        raise RuntimeError("Could not create an OBEX session on the stand-in")
+
+    durations = []
+    for _ in range(count):
+        start = time.monotonic()
+        transfer = manager.run_in_loop(manager.send_file_async, DEVICE_ADDRESS, payload_path).result(timeout)
+        status = transfer.future.result(timeout)
+        durations.append(time.monotonic() - start)
+        if status != "complete":
+            raise RuntimeError(f"Transfer ended with status {status}")
+    results["sequential"] = summarize(durations, size)
+
+    start = time.monotonic()
+    transfers = manager.run_in_loop(manager.send_files_async, DEVICE_ADDRESS, [payload_path] * count).result(timeout)
+    statuses = [transfer.future.result(timeout) for transfer in transfers]
+    elapsed = time.monotonic() - start
+    failed = [status for status in statuses if status != "complete"]
+    if failed:
+        raise RuntimeError(f"Pipelined transfers failed: {failed}")
+    results["pipelined"] = {"count": count, "total_ms": elapsed * 1000,
+                            "mb_per_s": size * count / elapsed / 1e6 if elapsed else None}
+    manager.run_in_loop(manager.close_obex_sessions).result(timeout)
+    return results
+
+
+def check_unpair(manager, count, timeout):
+    """Unpair the stand-in devices four at a time and check that each one is gone.
+
+    Runs before the loop thread starts, so the manager waits with wait_for_future
+    and its object cache reloads the tree on lookups made outside the loop.
+
+    Returns:
+        The device count and the time unpair_many took.
+    """
+    addresses = unpair_addresses(count)
+    paths = []
+    for address in addresses:
+        path = manager.get_device_path(address)
+        if not path:
+            raise RuntimeError(f"Stand-in device {address} is not known to the manager")
+        manager.get_device_interface(path, "org.bluez.Device1")
+        paths.append(path)
+
+    start = time.monotonic()
+    results = manager.wait_for_future(manager.unpair_many(addresses, concurrency=4), timeout)
+    elapsed = time.monotonic() - start
+    if results is None:
+        raise RuntimeError("unpair_many did not finish")
+    failed = [address for address, result in results.items() if not result["result"]]
+    if failed:
+        raise RuntimeError(f"unpair_many reported failures for {', '.join(failed)}")
+    remaining = [address for address in addresses if manager.object_cache.find_device_path(manager.adapter_path, address)]
+    if remaining:
+        raise RuntimeError(f"Unpaired devices still cached: {', '.join(remaining)}")
+    pooled = [path for path in paths if path in manager.proxy_pool.entries]
+    if pooled:
+        raise RuntimeError(f"Proxies of unpaired devices still pooled: {', '.join(pooled)}")
+    return {"count": count, "total_ms": elapsed * 1000}
+
+
+def benchmark_receive(manager, receive_directory, args, log):
+    """Measure when pushed files arrive and how quickly receive_file hands them over.
+
+    A file's arrival is its last write (st_mtime). Handover latency is the time from
+    arrival until receive_file returns it. First arrival and throughput are measured
+    from server start, so they include starting the sender process.
+    """
+    from libraries.bluetooth.opp_receiver import OppReceiveServer
+
+    command = [sys.executable, os.path.abspath(__file__), "--push-sender", receive_directory,
+               "--size", str(args.size), "--count", str(args.count),
+               "--chunk-size", str(args.chunk_size), "--rate", str(args.rate)]
+    server = OppReceiveServer(receive_directory, log, command=command)
+    start = time.time()
+    server.start()
+    manager.opp_server = server
+    arrivals = []
+    handovers = []
+    try:
+        for _ in range(args.count):
+            path = manager.receive_file(save_directory=receive_directory, timeout=args.timeout)
+            returned = time.time()
+            if path is None:
+                raise RuntimeError("No file received from the stand-in sender")
+            arrived = os.stat(path).st_mtime
+            arrivals.append(arrived)
+            handovers.append(max(0.0, returned - arrived))
+            if os.path.getsize(path) != args.size:
+                raise RuntimeError(f"{path} was handed over before it was complete")
+    finally:
+        manager.stop_opp_receiver()
+    arrivals.sort()
+    gaps = [later - earlier for earlier, later in zip(arrivals, arrivals[1:])]
+    elapsed = arrivals[-1] - start
+    return {
+        "first_arrival_ms": (arrivals[0] - start) * 1000,
+        "last_arrival_ms": elapsed * 1000,
+        "arrival_gap_ms": {"median": statistics.median(gaps) * 1000, "max": max(gaps) * 1000} if gaps else None,
+        "handover_ms": {"median": statistics.median(handovers) * 1000, "max": max(handovers) * 1000},
+        "mb_per_s": args.size * args.count / elapsed / 1e6 if elapsed > 0 else None,
+    }
+
+
+def run_benchmark(args):
+    """Start the private bus and stand-in, then run the requested measurements.
+
+    Args:
+        args: Parsed command-line arguments.
+
+    Returns:
+        Results dictionary, as printed by print_report or dumped with --json.
+    """
+    work_directory = tempfile.mkdtemp(prefix="obex_benchmark_")
+    daemon = stand_in = manager = None
+    log = logging.getLogger("obex_benchmark")
+    try:
+        daemon = start_private_bus()
+        stand_in = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--stand-in",
+                                     "--chunk-size", str(args.chunk_size), "--rate", str(args.rate),
+                                     "--unpair", str(args.unpair)])
+        wait_for_names([BLUEZ_SERVICE, OBEX_SERVICE])
+
+        # Imported only now: the manager connects to the buses named in the environment.
+        from libraries.bluetooth.bluez_gatt import BluetoothDeviceManager
+
+        start = time.monotonic()
+        manager = BluetoothDeviceManager(log=log, interface=ADAPTER)
+        results = {"size": args.size, "count": args.count, "rate": args.rate,
+                   "manager_setup_ms": (time.monotonic() - start) * 1000}
+        if args.unpair:
+            results["unpair"] = check_unpair(manager, args.unpair, args.timeout)
+        manager.start_mainloop_thread()
+
+        if not args.skip_send:
+            payload_path = os.path.join(work_directory, "payload.bin")
+            with open(payload_path, "wb") as payload:
+                payload.write(os.urandom(args.size))
+            results["send"] = benchmark_send(manager, payload_path, args.size, args.count, args.timeout)
+        if not args.skip_receive:
+            receive_directory = os.path.join(work_directory, "received")
+            os.makedirs(receive_directory)
+            results["receive"] = benchmark_receive(manager, receive_directory, args, log)
+        return results
+    finally:
+        if manager is not None:
+            manager.stop_mainloop_thread()
+        for process in (stand_in, daemon):
+            if process is not None and process.poll() is None:
+                process.terminate()
+                process.wait()
+        shutil.rmtree(work_directory, ignore_errors=True)
+
+
+def print_report(results):
+    """Print the results of run_benchmark as a short table."""
+    link = f", link {results['rate']} B/s" if results["rate"] else ""
+    print(f"OPP benchmark: {results['count']} x {results['size']} bytes{link}")
+    print(f"  manager setup         {results['manager_setup_ms']:9.1f} ms")
+    unpair = results.get("unpair")
+    if unpair:
+        print(f"  unpair {unpair['count']:3d} devices    {unpair['total_ms']:9.1f} ms total")
+    send = results.get("send")
+    if send:
+        sequential = send["sequential"]
+        print(f"  send session setup    {send['session_setup_ms']:9.1f} ms")
+        print(f"  send per transfer     {sequential['median_ms']:9.1f} ms median "
+              f"({sequential['min_ms']:.1f}-{sequential['max_ms']:.1f}), {sequential['mb_per_s']:.2f} MB/s")
+        print(f"  send pipelined        {send['pipelined']['total_ms']:9.1f} ms total, "
+              f"{send['pipelined']['mb_per_s']:.2f} MB/s")
+    receive = results.get("receive")
+    if receive:
+        print(f"  receive first arrival {receive['first_arrival_ms']:9.1f} ms")
+        gaps = receive["arrival_gap_ms"]
+        if gaps:
+            print(f"  receive arrival gap   {gaps['median']:9.1f} ms median (max {gaps['max']:.1f})")
+        print(f"  receive handover      {receive['handover_ms']['median']:9.1f} ms median "
+              f"(max {receive['handover_ms']['max']:.1f})")
+        print(f"  receive last arrival  {receive['last_arrival_ms']:9.1f} ms, {receive['mb_per_s']:.2f} MB/s")
+
+
+def main(argv=None):
+    """Parse arguments and run the benchmark, or the stand-in or sender helper process.
+
+    Returns:
+        Process exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=1024 * 1024, help="bytes per transfer")
+    parser.add_argument("--count", type=int, default=10, help="transfers per measurement")
+    parser.add_argument("--rate", type=int, default=0, help="simulated link rate in bytes/s (0 = unlimited)")
+    parser.add_argument("--chunk-size", type=int, default=32 * 1024, help="stand-in read/write size per step")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for one transfer")
+    parser.add_argument("--unpair", type=int, default=0, metavar="N",
+                        help="also unpair N stand-in devices with unpair_many and check they are gone")
+    parser.add_argument("--skip-send", action="store_true")
+    parser.add_argument("--skip-receive", action="store_true")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--stand-in", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--push-sender", metavar="DIR", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.stand_in:
+        run_stand_in(args.chunk_size, args.rate, args.unpair)
+        return 0
+    if args.push_sender:
+        run_push_sender(args.push_sender, args.size, args.count, args.chunk_size, args.rate)
+        return 0
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    results = run_benchmark(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
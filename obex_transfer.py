@@ -0,0 +1,98 @@
+"""Handle for an OBEX Object Push transfer started without blocking."""
+import time
+
+from concurrent.futures import Future
+
+FINAL_STATUSES = ("complete", "error", "cancelled")
+
+
+class ObexTransfer:
+    """Tracks one OBEX transfer from org.bluez.obex.Transfer1 PropertiesChanged signals.
+
+    future resolves with the final status ("complete", "error" or "cancelled").
+    Progress callbacks are called as callback(transfer) whenever Status or
+    Transferred changes; transferred, size, rate (bytes per second) and eta
+    (seconds, None while unknown) are then up to date.
+    """
+
+    def __init__(self, file_path, progress_callback=None):
+        """Create a handle for a transfer that has not been started yet.
+
+        Args:
+            file_path: Path of the file being sent.
+            progress_callback: Optional callable invoked with this transfer on progress.
+        """
+        self.file_path = file_path
+        self.path = None
+        self.session_path = None
+        self.status = "queued"
+        self.size = 0
+        self.transferred = 0
+        self.created = time.monotonic()
+        self.started = None
+        self.finished = None
+        self.rate = 0.0
+        self.eta = None
+        self.progress_callbacks = [progress_callback] if progress_callback else []
+        self.future = Future()
+        self.future.set_running_or_notify_cancel()
+
+    def add_progress_callback(self, callback):
+        self.progress_callbacks.append(callback)
+
+    def attach(self, path, properties):
+        """Bind the handle to the Transfer1 object returned by SendFile."""
+        self.path = str(path)
+        if "Size" in properties:
+            self.size = int(properties["Size"])
+        if "Status" in properties:
+            self.status = str(properties["Status"])
+
+    def update(self, changed):
+        """Apply a Transfer1 PropertiesChanged payload.
+
+        Args:
+            changed: Dictionary of changed Transfer1 properties.
+        """
+        now = time.monotonic()
+        if "Size" in changed:
+            self.size = int(changed["Size"])
+        if "Transferred" in changed:
+            self.transferred = int(changed["Transferred"])
+            if self.started is None:
+                self.started = now
+        if "Status" in changed:
+            self.status = str(changed["Status"])
+            if self.status == "active" and self.started is None:
+                self.started = now
+            if self.status == "complete" and self.size:
+                self.transferred = self.size
+        if self.started is not None and now > self.started:
+            self.rate = self.transferred / (now - self.started)
+            if self.rate and self.size:
+                self.eta = max(0.0, (self.size - self.transferred) / self.rate)
+        for callback in list(self.progress_callbacks):
+            callback(self)
+        if self.status in FINAL_STATUSES:
+            self.finish(self.status)
+
+    def finish(self, status):
+        """Resolve the future with a final status (only the first call counts)."""
+        if self.future.done():
+            return
+        self.status = status
+        self.finished = time.monotonic()
+        if status == "complete":
+            self.eta = 0.0
+        self.future.set_result(status)
+
+    def percent(self):
+        """Return the completed share of the file as an integer percentage."""
+        if not self.size:
+            return 100 if self.status == "complete" else 0
+        return min(100, self.transferred * 100 // self.size)
+
+    def elapsed(self):
+        """Return seconds from start (or creation, if never started) to finish or now."""
+        end = self.finished if self.finished is not None else time.monotonic()
+        return end - (self.started if self.started is not None else self.created)
@@ -0,0 +1,231 @@
+"""OPP receive side: completion-based directory watching and a persistent receive server.
+
+obexpushd writes incoming objects straight into its output directory. Rather than
+polling the directory, DirectoryWatcher asks the kernel (inotify) to report files
+that were created and then closed after writing, or moved into place, so a file is
+only reported once obexpushd has finished with it and no CPU is used while waiting.
+Files that already existed when the watch started are never reported, even if
+another process rewrites them.
+OppReceiveServer keeps obexpushd running and queues every file the watcher reports.
+"""
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import struct
+import subprocess
+import threading
+import time
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+_EVENT_HEADER = struct.Struct("iIII")
+_READ_SIZE = 64 * 1024
+_libc = None
+
+
+def _get_libc():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        _libc.inotify_init1.argtypes = [ctypes.c_int]
+        _libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return _libc
+
+
+class DirectoryWatcher:
+    """Reports files created in one directory once their writing has completed."""
+
+    def __init__(self, directory, mask=IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_TO):
+        """Start watching a directory.
+
+        Args:
+            directory: Directory to watch; it must exist.
+            mask: inotify event mask; the default reports new files once closed after
+                writing, and files moved in.
+
+        Raises:
+            OSError: If inotify is unavailable or the directory cannot be watched.
+        """
+        libc = _get_libc()
+        self.directory = directory
+        # Files created since the watch started whose IN_CLOSE_WRITE is still due,
+        # with the time.time() their IN_CREATE was read.
+        self.created = {}
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"inotify_init1 failed: {os.strerror(error)}")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            self.fd = None
+            raise OSError(error, f"Cannot watch {directory}: {os.strerror(error)}")
+
+    def fileno(self):
+        return self.fd
+
+    def read_raw_events(self):
+        """Return pending (name, mask) file events without blocking."""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, _READ_SIZE)
+            except BlockingIOError:
+                return events
+            if not data:
+                return events
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    raise OSError("inotify event queue overflowed")
+                if name and not mask & (IN_ISDIR | IN_IGNORED):
+                    events.append((os.fsdecode(name), mask))
+
+    def read_events(self):
+        """Return the new files completed since the last read, without blocking.
+
+        Returns:
+            List of (name, started) pairs, where started is the time.time() the file was
+            created, or None if it was moved in without being created here first.
+        """
+        completed = []
+        for name, mask in self.read_raw_events():
+            if mask & IN_CREATE:
+                self.created[name] = time.time()
+            elif mask & IN_MOVED_TO:
+                completed.append((name, self.created.pop(name, None)))
+            elif mask & IN_CLOSE_WRITE and name in self.created:
+                # Closed after writing but created before the watch started: not reported.
+                completed.append((name, self.created.pop(name)))
+        return completed
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class OppReceiveServer:
+    """Long-lived OPP receive service that queues every completed incoming file.
+
+    obexpushd is started once and kept running (it is restarted if it exits), so
+    any number of objects, from one or several senders at a time, are accepted
+    without per-transfer process startup. A watcher thread turns inotify events
+    into records on the received queue:
+
+        {"path", "name", "size", "started", "finished", "duration", "throughput"}
+
+    where started/finished are time.time() values, duration is in seconds and
+    throughput in bytes per second (None when the file was moved in complete).
+    """
+
+    def __init__(self, save_directory="/tmp", log=None, command=None):
+        """Prepare the server; call start() to run it.
+
+        Args:
+            save_directory: Directory obexpushd stores received objects in.
+            log: Logger instance.
+            command: obexpushd command line; defaults to Bluetooth-only, foreground mode.
+        """
+        self.save_directory = save_directory
+        self.log = log
+        self.command = command or ["obexpushd", "-B", "-o", save_directory, "-n"]
+        self.received = queue.Queue()
+        self.process = None
+        self.watcher = None
+        self.thread = None
+        self.wake_read = None
+        self.wake_write = None
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        """Start obexpushd and the watcher thread; does nothing if already running."""
+        if self.is_running():
+            return
+        os.makedirs(self.save_directory, exist_ok=True)
+        self.watcher = DirectoryWatcher(self.save_directory, IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_TO)
+        self.wake_read, self.wake_write = os.pipe()
+        self.start_process()
+        self.thread = threading.Thread(target=self.run, name="opp-receive-server", daemon=True)
+        self.thread.start()
+
+    def start_process(self):
+        self.process = subprocess.Popen(self.command)
+        if self.log:
+            self.log.info("OPP receive server started (pid %s) in %s", self.process.pid, self.save_directory)
+
+    def run(self):
+        while True:
+            readable, _, _ = select.select([self.watcher.fd, self.wake_read], [], [], 1.0)
+            if self.wake_read in readable:
+                return
+            if self.watcher.fd in readable:
+                for name, started in self.watcher.read_events():
+                    self.on_file_completed(name, started)
+            if self.process.poll() is not None:
+                if self.log:
+                    self.log.warning("obexpushd exited with %s, restarting", self.process.returncode)
+                self.start_process()
+
+    def on_file_completed(self, name, started):
+        now = time.time()
+        path = os.path.join(self.save_directory, name)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        duration = now - started if started is not None else None
+        record = {
+            "path": path,
+            "name": name,
+            "size": size,
+            "started": started,
+            "finished": now,
+            "duration": duration,
+            "throughput": size / duration if duration else None,
+        }
+        if self.log:
+            self.log.info("Received %s (%s bytes)", name, size)
+        self.received.put(record)
+
+    def get(self, timeout=None):
+        """Return the next received file record, or None if none arrives within timeout."""
+        try:
+            return self.received.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def stop(self):
+        """Stop the watcher thread and obexpushd."""
+        if self.thread is not None:
+            os.write(self.wake_write, b"\0")
+            self.thread.join()
+            self.thread = None
+        for fd in (self.wake_read, self.wake_write):
+            if fd is not None:
+                os.close(fd)
+        self.wake_read = self.wake_write = None
+        if self.watcher is not None:
+            self.watcher.close()
+            self.watcher = None
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait()
+        self.process = None
+        if self.log:
+            self.log.info("OPP receive server stopped.")
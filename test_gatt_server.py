@@ -1,232 +1,462 @@
+import array
 import dbus
 import dbus.service
 import dbus.mainloop.glib
 from gi.repository import GLib
+import json
 import random
+import socket
+import time
 
 from libraries.bluetooth import constants
+from libraries.bluetooth.ieee11073 import float_to_raw
+from libraries.bluetooth.value_providers import RandomProvider, make_sample_provider
 from Utils.logger import Logger
 import struct
-log = Logger('battery_service_logs')
-
-
-class BatteryService(dbus.service.Object):
-    def __init__(self, bus, index, mainloop):
-        #self.path = constants.service_path + f"{instance_id}_service{index}"
-        self.path = constants.service_path + f"_service{index}"
-
-        self.bus = bus
-        self.uuid = constants.battery_service_uuid  # "180F"
-        self.primary = True
-        self.characteristics = []
-        dbus.service.Object.__init__(self, bus, self.path)
-        self.battery_level_char = BatteryLevelCharacteristic(bus, 0, self, mainloop)
-        self.characteristics.append(self.battery_level_char)
-        self.battery_level_status = BatteryLevelStatusCharacteristic(bus, 1, self, mainloop)
-        self.characteristics.append(self.battery_level_status)
-
-    def get_path(self):
-        return dbus.ObjectPath(self.path)
-
-    def get_properties(self):
-        return {
-            constants.gatt_service_interface: {
-                'UUID': self.uuid,
-                'Primary': dbus.Boolean(self.primary),
-                'Characteristics': dbus.Array(
-                    [char.get_path() for char in self.characteristics],
-                    signature='o'
-                )
-            }
-        }
 
-    def get_characteristics(self):
-        return self.characteristics
+try:
+    import yaml
+except ImportError:
+    yaml = None
 
+log = Logger('battery_service_logs')
 
-class BatteryLevelCharacteristic(dbus.service.Object):
-    def __init__(self, bus, index, service, mainloop):
-        #self.path = service.get_path() + f'/char{index}_{instance_id}'
-        self.path = service.get_path() + f'/char{index}'
-
-        self.bus = bus
-        self.service = service
-        self.uuid = constants.battery_level_uuid
-        self.flags = ['read', 'notify']
-        self.notifying = False
-        self.mainloop = mainloop
-        dbus.service.Object.__init__(self, bus, self.path)
-        self.descriptor = BatteryLevelDescriptor(bus, 0, self)
-
-    def get_path(self):
-        return dbus.ObjectPath(self.path)
 
-    def get_properties(self):
-        return {
-            constants.gatt_characteristic_interface: {
-                'UUID': self.uuid,
-                'Service': self.service.get_path(),
-                'Flags': dbus.Array(self.flags, signature='s'),
-                'Descriptors': dbus.Array([self.descriptor.get_path()], signature='o')
-            }
-        }
+def to_byte_array(value):
+    """Wrap an attribute value as dbus.ByteArray, marshalled as 'ay' in one copy."""
+    return dbus.ByteArray(bytes(value))
+
+
+# Constant attribute values, encoded once at import.
+CCCD_DISABLED_VALUE = to_byte_array(b"\x00\x00")
+SCAN_REFRESH_REQUIRED_VALUE = to_byte_array(b"\x00")
+
+
+class NotificationScheduler:
+    """One GLib timer driving every periodic notification of the GATT server.
+
+    Subscriptions with the same period share a group and fire in the same wakeup;
+    the timer is armed for the earliest due group and only while at least one
+    characteristic is subscribed. Groups due within slack_ms of each other are
+    also served by the same wakeup.
+    """
+
+    def __init__(self, slack_ms=10):
+        self.slack_ms = slack_ms
+        self.groups = {}
+        self.periods = {}
+        self.timer_id = None
+        self.armed_for = None
+
+    @staticmethod
+    def now_ms():
+        return time.monotonic() * 1000
+
+    def subscribe(self, key, period_ms, callback):
+        """Call callback() every period_ms until unsubscribed or it returns False.
+
+        Args:
+            key: Hashable owner of the subscription (normally the characteristic).
+            period_ms: Notification period in milliseconds.
+            callback: Zero-argument callable; returning False ends the subscription.
+        """
+        self.unsubscribe(key, rearm=False)
+        group = self.groups.get(period_ms)
+        if group is None:
+            group = {"due": self.now_ms() + period_ms, "callbacks": {}}
+            self.groups[period_ms] = group
+        group["callbacks"][key] = callback
+        self.periods[key] = period_ms
+        self.arm()
+
+    def unsubscribe(self, key, rearm=True):
+        """Remove a subscription; the timer is cancelled once nothing is subscribed."""
+        period_ms = self.periods.pop(key, None)
+        if period_ms is None:
+            return
+        group = self.groups[period_ms]
+        group["callbacks"].pop(key, None)
+        if not group["callbacks"]:
+            del self.groups[period_ms]
+        if rearm:
+            self.arm()
+
+    def reschedule(self, key, period_ms):
+        """Move an existing subscription to a new period."""
+        period = self.periods.get(key)
+        if period is None or period == period_ms:
+            return
+        self.subscribe(key, period_ms, self.groups[period]["callbacks"][key])
 
-    @dbus.service.method(constants.gatt_characteristic_interface, in_signature='a{sv}', out_signature='ay')
-    def ReadValue(self, options):
-        """Return current battery level"""
-        level = random.randint(10, 100)
-        log.info(f"Battery Level read: {level}%")
-        return [dbus.Byte(level)]
+    def is_subscribed(self, key):
+        return key in self.periods
 
-    @dbus.service.method(constants.gatt_characteristic_interface, in_signature='', out_signature='')
-    def StartNotify(self):
-        if self.notifying:
+    def arm(self):
+        if not self.groups:
+            self.cancel_timer()
             return
-        self.notifying = True
-        log.info("Battery Level: Notifications started")
-        GLib.timeout_add(3000, self.notify_battery_level)
+        next_due = min(group["due"] for group in self.groups.values())
+        if self.timer_id is not None and self.armed_for == next_due:
+            return
+        self.cancel_timer()
+        delay = max(0, int(next_due - self.now_ms()))
+        self.timer_id = GLib.timeout_add(delay, self.on_timer)
+        self.armed_for = next_due
+
+    def cancel_timer(self):
+        if self.timer_id is not None:
+            GLib.source_remove(self.timer_id)
+            self.timer_id = None
+            self.armed_for = None
+
+    def on_timer(self):
+        self.timer_id = None
+        self.armed_for = None
+        now = self.now_ms()
+        for period_ms, group in list(self.groups.items()):
+            if group["due"] > now + self.slack_ms:
+                continue
+            group["due"] += period_ms
+            if group["due"] <= now:
+                group["due"] = now + period_ms
+            for key, callback in list(group["callbacks"].items()):
+                try:
+                    keep = callback()
+                except Exception as error:
+                    log.warning(f"Notification callback failed: {error}")
+                    keep = True
+                if keep is False:
+                    self.unsubscribe(key, rearm=False)
+        self.arm()
+        return False
+
+
+notification_scheduler = NotificationScheduler()
+
+
+class AcquirableCharacteristic(dbus.service.Object):
+    """Base for characteristics that can hand BlueZ a socket instead of using D-Bus for values.
+
+    When acquire_notify is set the characteristic exposes NotifyAcquired, BlueZ calls
+    AcquireNotify when a client subscribes and notifications are written as raw bytes
+    to the returned socket. When acquire_write is set it exposes WriteAcquired and
+    writes without response arrive on a socket instead of WriteValue calls. Both are
+    off by default, in which case values go out through PropertiesChanged as before.
+    """
+    acquire_notify = False
+    acquire_write = False
+    notify_socket = None
+    write_socket = None
+    notify_watch = None
+    write_watch = None
+    notify_mtu = 23
+    write_mtu = 23
+
+    def acquired_properties(self):
+        """Return the NotifyAcquired/WriteAcquired properties to merge into get_properties."""
+        properties = {}
+        if self.acquire_notify:
+            properties['NotifyAcquired'] = dbus.Boolean(self.notify_socket is not None)
+        if self.acquire_write:
+            properties['WriteAcquired'] = dbus.Boolean(self.write_socket is not None)
+        return properties
+
+    def open_acquired_socket(self, options, on_io):
+        local, remote = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        local.setblocking(False)
+        condition = GLib.IOCondition.IN | GLib.IOCondition.HUP | GLib.IOCondition.ERR
+        watch = GLib.io_add_watch(local.fileno(), GLib.PRIORITY_DEFAULT, condition, on_io)
+        fd = dbus.types.UnixFd(remote)
+        remote.close()
+        return local, fd, int(options.get('mtu', 23)), watch
+
+    @dbus.service.method(constants.gatt_characteristic_interface, in_signature='a{sv}', out_signature='hq')
+    def AcquireNotify(self, options):
+        if not self.acquire_notify:
+            raise dbus.exceptions.DBusException('org.bluez.Error.NotSupported', 'AcquireNotify is not enabled')
+        self.release_notify_socket()
+        self.notify_socket, fd, self.notify_mtu, self.notify_watch = self.open_acquired_socket(
+            options, self.on_notify_socket_io)
+        self.StartNotify()
+        log.info(f"{self.uuid}: notification socket acquired (mtu {self.notify_mtu})")
+        return fd, dbus.UInt16(self.notify_mtu)
+
+    @dbus.service.method(constants.gatt_characteristic_interface, in_signature='a{sv}', out_signature='hq')
+    def AcquireWrite(self, options):
+        if not self.acquire_write:
+            raise dbus.exceptions.DBusException('org.bluez.Error.NotSupported', 'AcquireWrite is not enabled')
+        self.release_write_socket()
+        self.write_socket, fd, self.write_mtu, self.write_watch = self.open_acquired_socket(
+            options, self.on_write_socket_io)
+        log.info(f"{self.uuid}: write socket acquired (mtu {self.write_mtu})")
+        return fd, dbus.UInt16(self.write_mtu)
+
+    def on_notify_socket_io(self, fd, condition):
+        # BlueZ closes its end when the client disables notifications.
+        self.notify_watch = None
+        self.release_notify_socket()
+        self.StopNotify()
+        log.info(f"{self.uuid}: notification socket released")
+        return False
+
+    def on_write_socket_io(self, fd, condition):
+        if condition & GLib.IOCondition.IN and self.write_socket is not None:
+            try:
+                data = self.write_socket.recv(self.write_mtu)
+            except BlockingIOError:
+                return True
+            except OSError:
+                data = b""
+            if data:
+                self.handle_acquired_write(data)
+                return True
+        self.write_watch = None
+        self.release_write_socket()
+        log.info(f"{self.uuid}: write socket released")
+        return False
+
+    def handle_acquired_write(self, data):
+        """Deliver bytes received on the write socket; defaults to WriteValue."""
+        self.WriteValue(data, {})
+
+    def release_notify_socket(self):
+        if self.notify_watch is not None:
+            GLib.source_remove(self.notify_watch)
+            self.notify_watch = None
+        if self.notify_socket is not None:
+            self.notify_socket.close()
+            self.notify_socket = None
+
+    def release_write_socket(self):
+        if self.write_watch is not None:
+            GLib.source_remove(self.write_watch)
+            self.write_watch = None
+        if self.write_socket is not None:
+            self.write_socket.close()
+            self.write_socket = None
+
+    def send_value(self, value):
+        """Send a notification, over the acquired socket if there is one.
+
+        Args:
+            value: Characteristic value as bytes or a list of byte values.
+        """
+        if self.notify_socket is not None:
+            try:
+                self.notify_socket.send(bytes(value))
+                return
+            except BlockingIOError:
+                log.debug(f"{self.uuid}: notification socket full, dropping value")
+                return
+            except OSError as error:
+                log.warning(f"{self.uuid}: notification socket failed: {error}")
+                self.release_notify_socket()
+        self.PropertiesChanged(constants.gatt_characteristic_interface,
+                               {'Value': to_byte_array(value)}, [])
 
-    @dbus.service.method(constants.gatt_characteristic_interface, in_signature='', out_signature='')
-    def StopNotify(self):
-        self.notifying = False
-        log.info("Battery Level: Notifications stopped")
 
-    def notify_battery_level(self):
-        if not self.notifying:
-            return False
-        level = random.randint(5, 100)
-        value = [dbus.Byte(level)]
-        log.debug(f"Sending battery level notification: {level}%")
-        self.PropertiesChanged(constants.gatt_characteristic_interface, {'Value': value}, [])
-        return True  # Continue timeout
+# Advertising data (and scan response) size limits: legacy PDUs and BlueZ's extended
+# advertising maximum.
+LEGACY_ADV_DATA_MAX = 31
+EXTENDED_ADV_DATA_MAX = 251
+# Flags AD structure that BlueZ adds to every peripheral advertisement.
+ADV_FLAGS_SIZE = 3
+ADV_INTERVAL_MIN_MS = 20
+ADV_INTERVAL_MAX_MS = 10485
+ADV_SECONDARY_CHANNELS = ("1M", "2M", "Coded")
 
-    @dbus.service.signal(dbus_interface='org.freedesktop.DBus.Properties', signature='sa{sv}as')
-    def PropertiesChanged(self, interface, changed, invalidated):
-        pass
 
+def _uuid_size(uuid):
+    """Return the on-air size in bytes of a 16-, 32- or 128-bit UUID string."""
+    digits = len(str(uuid).replace("-", ""))
+    if digits <= 4:
+        return 2
+    if digits <= 8:
+        return 4
+    return 16
 
 
-class BatteryLevelDescriptor(dbus.service.Object):
-    def __init__(self, bus, index, characteristic):
-        #self.path = characteristic.get_path() + f'/desc{index}_{instance_id}'
-        self.path = characteristic.get_path() + f'/desc{index}'
+class Advertisement(dbus.service.Object):
+    """LE advertisement object; each instance gets its own path so several can be registered.
+
+    The LEAdvertisement1 property dictionary is validated and built once, and only
+    rebuilt when update() changes a field.
+    """
+    FIELDS = ("service_uuids", "local_name", "manufacturer_data", "service_data", "min_interval",
+              "max_interval", "duration", "timeout", "secondary_channel", "tx_power", "include_tx_power")
+
+    def __init__(self, bus, service_uuid, index=0, local_name="GATT_Test_Server", manufacturer_data=None,
+                 **options):
+        """Export an advertisement object.
+
+        Args:
+            bus: D-Bus connection.
+            service_uuid: Service UUID, or a list of UUIDs, to advertise.
+            index: Advertisement instance number, used for the object path.
+            local_name: Advertised local name.
+            manufacturer_data: Optional mapping of company ID to data bytes.
+            **options: service_data (mapping of UUID to bytes), min_interval and
+                max_interval (ms), duration and timeout (s), secondary_channel
+                ("1M", "2M" or "Coded", enables extended advertising), tx_power (dBm)
+                and include_tx_power.
+
+        Raises:
+            ValueError: If the payload does not fit or an option is out of range.
+        """
+        unknown = set(options) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown advertisement options: {', '.join(sorted(unknown))}")
+        self.service_uuids = []
+        self.local_name = None
+        self.manufacturer_data = {}
+        self.service_data = {}
+        self.min_interval = None
+        self.max_interval = None
+        self.duration = None
+        self.timeout = None
+        self.secondary_channel = None
+        self.tx_power = None
+        self.include_tx_power = True
+        self.properties = None
+        self.set_fields(service_uuids=service_uuid, local_name=local_name,
+                        manufacturer_data=manufacturer_data or {}, **options)
+        self.index = index
+        self.path = constants.advertisement_path + f"{index}"
 
         self.bus = bus
-        self.characteristic = characteristic
-        self.uuid = constants.client_characteristic_config_uuid
-        self.flags = ['read', 'write']
         dbus.service.Object.__init__(self, bus, self.path)
 
     def get_path(self):
         return dbus.ObjectPath(self.path)
 
-    def get_properties(self):
-        return {
-            constants.gatt_descriptor_interface: {
-                'UUID': self.uuid,
-                'Characteristic': self.characteristic.get_path(),
-                'Flags': dbus.Array(self.flags, signature='s'),
-            }
-        }
-
-    @dbus.service.method(constants.gatt_descriptor_interface, in_signature='a{sv}', out_signature='ay')
-    def ReadValue(self, options):
-        log.debug("Battery Level Descriptor: ReadValue")
-        return [dbus.Byte(0x00), dbus.Byte(0x00)]
-
-    @dbus.service.method(constants.gatt_descriptor_interface, in_signature='aya{sv}', out_signature='')
-    def WriteValue(self, value, options):
-        log.debug(f"Battery Level Descriptor: WriteValue {value}")
-
-
-class BatteryLevelStatusCharacteristic(dbus.service.Object):
-    """Simulated Battery Level Status characteristic (0=Unknown, 1=Good, 2=Low, 3=Critical)"""
-    def __init__(self, bus, index, service, mainloop):
-       # self.path = service.get_path() + f'/char{index}_{instance_id}'
-        self.path = service.get_path() + f'/char{index}'
-        self.bus = bus
-        self.descriptor = BatteryLevelDescriptor(bus, 0, self)
-        self.service = service
-        self.uuid = constants.battery_level_status_uuid  # "2A1B"
-        self.flags = ['read', 'notify']
-        self.notifying = False
-        self.mainloop = mainloop
-        dbus.service.Object.__init__(self, bus, self.path)
-
-    def get_path(self):
-        return dbus.ObjectPath(self.path)
+    def set_fields(self, **fields):
+        """Validate and apply new field values, keeping the old ones if validation fails."""
+        previous = {name: getattr(self, name) for name in fields}
+        for name, value in fields.items():
+            if name not in self.FIELDS:
+                raise ValueError(f"Unknown advertisement field: {name}")
+            if name == "service_uuids" and isinstance(value, str):
+                value = [value]
+            elif name == "service_uuids":
+                value = list(value)
+            elif name in ("manufacturer_data", "service_data"):
+                value = {key: bytes(data) for key, data in value.items()}
+            setattr(self, name, value)
+        try:
+            self.validate()
+        except ValueError:
+            for name, value in previous.items():
+                setattr(self, name, value)
+            raise
+        self.properties = None
+
+    def payload_size(self):
+        """Return the advertising data size in bytes that the current fields produce.
+
+        LocalName is not counted: BlueZ places it in the scan response (see scan_response_size).
+        """
+        size = ADV_FLAGS_SIZE
+        uuid_groups = {}
+        for uuid in self.service_uuids:
+            uuid_groups.setdefault(_uuid_size(uuid), []).append(uuid)
+        for uuid_size, uuids in uuid_groups.items():
+            size += 2 + uuid_size * len(uuids)
+        for data in self.manufacturer_data.values():
+            size += 4 + len(data)
+        for uuid, data in self.service_data.items():
+            size += 2 + _uuid_size(uuid) + len(data)
+        if self.include_tx_power:
+            size += 3
+        return size
+
+    def scan_response_size(self):
+        """Return the scan response size in bytes, which holds the local name."""
+        if not self.local_name:
+            return 0
+        return 2 + len(self.local_name.encode())
+
+    def validate(self):
+        """Check the payload size and the interval, channel and timing options.
+
+        Raises:
+            ValueError: Describing the first problem found.
+        """
+        limit = EXTENDED_ADV_DATA_MAX if self.secondary_channel else LEGACY_ADV_DATA_MAX
+        kind = "extended" if self.secondary_channel else "legacy"
+        size = self.payload_size()
+        if size > limit:
+            raise ValueError(f"Advertising data is {size} bytes, {kind} advertising allows {limit}")
+        size = self.scan_response_size()
+        if size > limit:
+            raise ValueError(f"Scan response (local name) is {size} bytes, {kind} advertising allows {limit}")
+        for name in ("min_interval", "max_interval"):
+            value = getattr(self, name)
+            if value is not None and not ADV_INTERVAL_MIN_MS <= value <= ADV_INTERVAL_MAX_MS:
+                raise ValueError(f"{name} must be {ADV_INTERVAL_MIN_MS}-{ADV_INTERVAL_MAX_MS} ms, got {value}")
+        if self.min_interval is not None and self.max_interval is not None and self.min_interval > self.max_interval:
+            raise ValueError("min_interval must not exceed max_interval")
+        if self.secondary_channel is not None and self.secondary_channel not in ADV_SECONDARY_CHANNELS:
+            raise ValueError(f"secondary_channel must be one of {ADV_SECONDARY_CHANNELS}")
+        for name in ("duration", "timeout"):
+            value = getattr(self, name)
+            if value is not None and not 0 <= value <= 0xFFFF:
+                raise ValueError(f"{name} must fit in 16 bits, got {value}")
+        if self.tx_power is not None and not -127 <= self.tx_power <= 20:
+            raise ValueError(f"tx_power must be -127..20 dBm, got {self.tx_power}")
 
     def get_properties(self):
-        return {
-            constants.gatt_characteristic_interface: {
-                'UUID': self.uuid,
-                'Service': self.service.get_path(),
-                'Flags': dbus.Array(self.flags, signature='s'),
-                'Descriptors': dbus.Array([self.descriptor.get_path()], signature='o')
-            }
+        if self.properties is not None:
+            return self.properties
+        properties = {
+            'Type': 'peripheral',
+            'ServiceUUIDs': dbus.Array(self.service_uuids, signature='s'),
+            'IncludeTxPower': dbus.Boolean(self.include_tx_power)
         }
-
-    @dbus.service.method(constants.gatt_characteristic_interface,
-                         in_signature='a{sv}', out_signature='ay')
-    def ReadValue(self, options):
-        status = random.choice([1, 2, 3])
-        status_map = {1: "Good", 2: "Low", 3: "Critical"}
-        log.info(f"Battery Level Status read: {status_map.get(status)}")
-        return [dbus.Byte(status)]
-
-    @dbus.service.method(constants.gatt_characteristic_interface,
-                         in_signature='', out_signature='')
-    def StartNotify(self):
-        if self.notifying:
-            return
-        self.notifying = True
-        log.info("Battery Level Status: Notifications started")
-        GLib.timeout_add(5000, self.notify_status)
-
-    @dbus.service.method(constants.gatt_characteristic_interface,
-                         in_signature='', out_signature='')
-    def StopNotify(self):
-        self.notifying = False
-        log.info("Battery Level Status: Notifications stopped")
-
-    def notify_status(self):
-        if not self.notifying:
-            return False
-        status = random.choice([1, 2, 3])
-        status_map = {1: "Good", 2: "Low", 3: "Critical"}
-        log.debug(f"Sending Battery Level Status notification: {status_map.get(status)}")
-        self.PropertiesChanged(constants.gatt_characteristic_interface,
-                               {'Value': [dbus.Byte(status)]}, [])
-        return True
-
-    @dbus.service.signal(dbus_interface='org.freedesktop.DBus.Properties',
-                         signature='sa{sv}as')
-    def PropertiesChanged(self, interface, changed, invalidated):
-        pass
-
-
-class Advertisement(dbus.service.Object):
-    def __init__(self, bus, service_uuid):
-        self.service_uuid = service_uuid
-        #self.path = constants.advertisement_path + f"{instance_id}"
-        self.path = constants.advertisement_path
-
-        self.bus = bus
-        dbus.service.Object.__init__(self, bus, self.path)
-
-    def get_path(self):
-        return dbus.ObjectPath(self.path)
+        if self.local_name:
+            properties['LocalName'] = dbus.String(self.local_name)
+        if self.manufacturer_data:
+            properties['ManufacturerData'] = dbus.Dictionary(
+                {dbus.UInt16(company): dbus.Array(data, signature='y')
+                 for company, data in self.manufacturer_data.items()}, signature='qv')
+        if self.service_data:
+            properties['ServiceData'] = dbus.Dictionary(
+                {str(uuid): dbus.Array(data, signature='y')
+                 for uuid, data in self.service_data.items()}, signature='sv')
+        if self.min_interval is not None:
+            properties['MinInterval'] = dbus.UInt32(self.min_interval)
+        if self.max_interval is not None:
+            properties['MaxInterval'] = dbus.UInt32(self.max_interval)
+        if self.duration is not None:
+            properties['Duration'] = dbus.UInt16(self.duration)
+        if self.timeout is not None:
+            properties['Timeout'] = dbus.UInt16(self.timeout)
+        if self.secondary_channel is not None:
+            properties['SecondaryChannel'] = dbus.String(self.secondary_channel)
+        if self.tx_power is not None:
+            properties['TxPower'] = dbus.Int16(self.tx_power)
+        self.properties = dbus.Dictionary(properties, signature='sv')
+        return self.properties
+
+    def update(self, **fields):
+        """Change advertised fields of a registered advertisement.
+
+        BlueZ refreshes the advertising data when the object emits PropertiesChanged.
+
+        Raises:
+            ValueError: If the new payload does not validate; the old one stays on air.
+        """
+        self.set_fields(**fields)
+        self.PropertiesChanged(constants.le_advertisement_interface, self.get_properties(), [])
 
     @dbus.service.method('org.freedesktop.DBus.Properties', in_signature='s', out_signature='a{sv}')
     def GetAll(self, interface):
         if interface != constants.le_advertisement_interface:
             raise dbus.exceptions.DBusException('org.freedesktop.DBus.Error.InvalidArgs', 'Invalid interface %s' % interface)
-        return {
-            'Type': 'peripheral',
-            'LocalName': 'GATT_Test_Server',
-            'ServiceUUIDs': [self.service_uuid],
-            'IncludeTxPower': True
-        }
+        return self.get_properties()
+
+    @dbus.service.signal('org.freedesktop.DBus.Properties', signature='sa{sv}as')
+    def PropertiesChanged(self, interface, changed, invalidated):
+        pass
 
     @dbus.service.method(constants.le_advertisement_interface, in_signature='', out_signature='')
     def Release(self):
@@ -238,222 +468,135 @@ class Application(dbus.service.Object):
         #self.path = f"/org/test/gatt/application{instance_id}"
         self.path = constants.gatt_application_path
 
-        self.services = []
-        dbus.service.Object.__init__(self, bus, self.path)
-
-    def get_path(self):
-        return dbus.ObjectPath(self.path)
-
-    def add_service(self, service):
-        self.services.append(service)
-
-    @dbus.service.method('org.freedesktop.DBus.ObjectManager', out_signature='a{oa{sa{sv}}}')
-    def GetManagedObjects(self):
-        response = {}
-        for service in self.services:
-            response[service.get_path()] = service.get_properties()
-            for char in service.get_characteristics():
-                response[char.get_path()] = char.get_properties()
-                if hasattr(char, "descriptor"):
-                    response[char.descriptor.get_path()] = char.descriptor.get_properties()
-        return response
-
-#Scan parameter service
-class ScanParametersService(dbus.service.Object):
-    """Scan Parameters Service (UUID 0x1813)"""
-
-    def __init__(self, bus, index, mainloop):
-        self.path = constants.service_path + f"_service{index}"
-        self.bus = bus
-        self.uuid = constants.scan_parameters_service_uuid
-        self.primary = True
-        self.mainloop = mainloop
-        self.characteristics = []
-
-        self.scan_interval = None
-        self.scan_window = None
-
-        dbus.service.Object.__init__(self, bus, self.path)
-
-        self.scan_int_win_char = ScanIntervalWindowCharacteristic(bus, 0, self, mainloop)
-        self.characteristics.append(self.scan_int_win_char)
-
-        self.scan_refresh_char = ScanRefreshCharacteristic(bus, 1, self, mainloop)
-        self.characteristics.append(self.scan_refresh_char)
-
-    def get_path(self):
-        return dbus.ObjectPath(self.path)
-
-    def get_properties(self):
-        return {
-            constants.gatt_service_interface: {
-                'UUID': self.uuid,
-                'Primary': dbus.Boolean(self.primary),
-                'Characteristics': dbus.Array(
-                    [c.get_path() for c in self.characteristics], signature='o'
-                )
-            }
-        }
-
-    def get_characteristics(self):
-        return self.characteristics
-
-
-class ScanIntervalWindowCharacteristic(dbus.service.Object):
-    """Scan Interval Window Characteristic (UUID 0x2A4F)"""
-
-    def __init__(self, bus, index, service, mainloop):
-        self.path = service.get_path() + f"/char{index}"
-        self.bus = bus
-        self.service = service
-        self.uuid = constants.scan_interval_window_uuid
-        self.flags = ['write-without-response']
-        self.mainloop = mainloop
-
-        dbus.service.Object.__init__(self, bus, self.path)
-
-    def get_path(self):
-        return dbus.ObjectPath(self.path)
-
-    def get_properties(self):
-        return {
-            constants.gatt_characteristic_interface: {
-                'UUID': self.uuid,
-                'Service': self.service.get_path(),
-                'Flags': dbus.Array(self.flags, signature='s')
-            }
-        }
-
-    @dbus.service.method(constants.gatt_characteristic_interface,
-                         in_signature='aya{sv}', out_signature='')
-    def WriteValue(self, value, options):
-        """Client writes scan interval + scan window (4 bytes little endian)"""
-        if len(value) != 4:
-            log.error("[SPS] Invalid Scan Interval Window size")
-            return
-
-        interval = value[0] | (value[1] << 8)
-        window = value[2] | (value[3] << 8)
-
-        self.service.scan_interval = interval
-        self.service.scan_window = window
-
-        log.info(f"Scan Interval Window updated by client: interval={interval} window={window}")
-
-
-class ScanRefreshCharacteristic(dbus.service.Object):
-    """Scan Refresh Characteristic (UUID 0x2A31)"""
-
-    def __init__(self, bus, index, service, mainloop):
-        self.path = service.get_path() + f"/char{index}"
         self.bus = bus
-        self.service = service
-        self.uuid = constants.scan_refresh_uuid
-        self.flags = ['notify']
-        self.notifying = False
-        self.mainloop = mainloop
-
+        self.services = []
+        self.next_index = 0
+        self.registered = False
+        self.managed_objects = None
+        # (characteristic, cached property dict) pairs whose NotifyAcquired/WriteAcquired
+        # change with AcquireNotify/AcquireWrite and are refreshed on every reply.
+        self.acquirable_properties = []
+        # Every object exported for this application, by path, in export order.
+        self.exported = {}
         dbus.service.Object.__init__(self, bus, self.path)
 
-        self.descriptor = ScanRefreshDescriptor(bus, 0, self)
-
-        self.refresh_interval_ms = 10000
-        GLib.timeout_add(self.refresh_interval_ms, self._refresh_loop)
-
     def get_path(self):
         return dbus.ObjectPath(self.path)
 
-    def get_properties(self):
-        return {
-            constants.gatt_characteristic_interface: {
-                'UUID': self.uuid,
-                'Service': self.service.get_path(),
-                'Flags': dbus.Array(self.flags, signature='s'),
-                'Descriptors': dbus.Array([self.descriptor.get_path()], signature='o')
-            }
-        }
+    def allocate_index(self):
+        """Return a service index that no other service of this application uses."""
+        index = self.next_index
+        self.next_index += 1
+        return index
 
-    @dbus.service.method(constants.gatt_characteristic_interface,
-                         in_signature='', out_signature='')
-    def StartNotify(self):
-        if not self.notifying:
-            self.notifying = True
-            log.info("Scan Refresh notifications started")
+    def get_service_objects(self, service):
+        """Return the service and every characteristic and descriptor below it."""
+        objects = [service]
+        for char in service.get_characteristics():
+            objects.append(char)
+            objects.extend(get_char_descriptors(char))
+        return objects
 
-    @dbus.service.method(constants.gatt_characteristic_interface,
-                         in_signature='', out_signature='')
-    def StopNotify(self):
-        if self.notifying:
-            self.notifying = False
-            log.info("Scan Refresh notifications stopped")
+    def add_service(self, service):
+        """Add a service; BlueZ only sees it after the application is (re-)registered."""
+        if any(existing.get_path() == service.get_path() for existing in self.services):
+            raise ValueError(f"Service path already in use: {service.get_path()}")
+        self.services.append(service)
+        self.invalidate_managed_objects()
+        for obj in self.get_service_objects(service):
+            self.exported[str(obj.get_path())] = obj
 
-    def send_refresh(self):
-        """Notify client that refresh is required (0x00)"""
-        if not self.notifying:
+    def remove_service(self, service):
+        """Remove a service and unexport its objects; BlueZ drops it on InterfacesRemoved."""
+        if service not in self.services:
             return
-
-        value = [dbus.Byte(0x00)]
-        log.info("Sending Scan Refresh notification")
-        self.PropertiesChanged(constants.gatt_characteristic_interface, {'Value': value}, [])
-
-    def _refresh_loop(self):
-        """Periodic loop to check if client notifications are enabled"""
-        if self.notifying:
-            self.send_refresh()
-        return True
-
-    @dbus.service.signal('org.freedesktop.DBus.Properties',
-                         signature='sa{sv}as')
-    def PropertiesChanged(self, interface, changed, invalidated):
+        self.stop_service(service)
+        self.services.remove(service)
+        self.invalidate_managed_objects()
+        for obj in reversed(self.get_service_objects(service)):
+            if self.registered:
+                self.InterfacesRemoved(obj.get_path(), list(obj.get_properties().keys()))
+            self.unexport(obj)
+
+    def stop_service(self, service):
+        """Stop the notification timers, acquired sockets and sample sources of a service."""
+        for char in service.get_characteristics():
+            notification_scheduler.unsubscribe(char, rearm=False)
+            if hasattr(char, "notifying"):
+                char.notifying = False
+            if isinstance(char, AcquirableCharacteristic):
+                char.release_notify_socket()
+                char.release_write_socket()
+        notification_scheduler.unsubscribe(service, rearm=False)
+        shutdown = getattr(service, "shutdown", None)
+        if shutdown is not None:
+            shutdown()
+        notification_scheduler.arm()
+
+    def unexport(self, obj):
+        self.exported.pop(str(obj.get_path()), None)
+        try:
+            obj.remove_from_connection(self.bus, obj.get_path())
+        except LookupError:
+            pass
+
+    def shutdown(self):
+        """Stop every service and unexport all objects in one pass, children first, then the application."""
+        for service in self.services:
+            self.stop_service(service)
+        self.services = []
+        self.registered = False
+        self.invalidate_managed_objects()
+        for obj in reversed(list(self.exported.values())):
+            self.unexport(obj)
+        self.unexport(self)
+
+    @dbus.service.signal('org.freedesktop.DBus.ObjectManager', signature='oa{sa{sv}}')
+    def InterfacesAdded(self, object_path, interfaces):
         pass
 
+    @dbus.service.signal('org.freedesktop.DBus.ObjectManager', signature='oas')
+    def InterfacesRemoved(self, object_path, interfaces):
+        pass
 
-class ScanRefreshDescriptor(dbus.service.Object):
-    """CCCD for Scan Refresh (Notifications)"""
-
-    def __init__(self, bus, index, characteristic):
-        self.path = characteristic.get_path() + f"/desc{index}"
-        self.bus = bus
-        self.characteristic = characteristic
-        self.uuid = constants.client_characteristic_config_uuid
-        self.flags = ['read', 'write']
-
-        dbus.service.Object.__init__(self, bus, self.path)
-
-    def get_path(self):
-        return dbus.ObjectPath(self.path)
-
-    def get_properties(self):
-        return {
-            constants.gatt_descriptor_interface: {
-                'UUID': self.uuid,
-                'Characteristic': self.characteristic.get_path(),
-                'Flags': dbus.Array(self.flags, signature='s'),
-            }
-        }
-
-    @dbus.service.method(constants.gatt_descriptor_interface,
-                         in_signature='a{sv}', out_signature='ay')
-    def ReadValue(self, options):
-        return [dbus.Byte(0x00), dbus.Byte(0x00)]
-
-    @dbus.service.method(constants.gatt_descriptor_interface,
-                         in_signature='aya{sv}', out_signature='')
-    def WriteValue(self, value, options):
-        """Enable/disable notifications via CCCD"""
-        log.debug(f"Scan Refresh CCCD Write: {value}")
-
-        if len(value) != 2:
-            return
+    def invalidate_managed_objects(self):
+        """Drop the cached GetManagedObjects reply; call after changing the exported tree."""
+        self.managed_objects = None
+        self.acquirable_properties = []
 
-        cccd_value = value[0] | (value[1] << 8)
+    def build_managed_objects(self):
+        """Build the GetManagedObjects reply with explicit D-Bus signatures."""
+        response = dbus.Dictionary({}, signature='oa{sa{sv}}')
+        self.acquirable_properties = []
+        for service in self.services:
+            for obj in self.get_service_objects(service):
+                interfaces = dbus.Dictionary(
+                    {interface: dbus.Dictionary(properties, signature='sv')
+                     for interface, properties in obj.get_properties().items()},
+                    signature='sa{sv}')
+                if isinstance(obj, AcquirableCharacteristic) and obj.acquired_properties():
+                    self.acquirable_properties.append(
+                        (obj, interfaces[constants.gatt_characteristic_interface]))
+                response[obj.get_path()] = interfaces
+        return response
 
-        if cccd_value == 0x0001:
-            self.characteristic.StartNotify()
-        elif cccd_value == 0x0000:
-            self.characteristic.StopNotify()
-        else:
-            log.warning(f"Unknown CCCD value: {cccd_value}")
+    @dbus.service.method('org.freedesktop.DBus.ObjectManager', out_signature='a{oa{sa{sv}}}')
+    def GetManagedObjects(self):
+        if self.managed_objects is None:
+            self.managed_objects = self.build_managed_objects()
+        # The tree is cached; whether a socket is acquired right now is not.
+        for char, properties in self.acquirable_properties:
+            properties.update(char.acquired_properties())
+        return self.managed_objects
+
+
+def get_char_descriptors(char):
+    """Return every descriptor of a characteristic, whichever attribute it is stored in."""
+    if hasattr(char, "get_descriptors"):
+        return char.get_descriptors()
+    if hasattr(char, "descriptor"):
+        return [char.descriptor]
+    return []
 
 #FINDME Profile
 class FindMeService(dbus.service.Object):
@@ -526,21 +669,83 @@ class ImmediateAlertCharacteristic(dbus.service.Object):
         log.info(f"[FindMeService] Immediate Alert Level Written: {msg}")
 
 
+class MeasurementStore:
+    """Bounded ring buffer of timestamped temperature readings.
+
+    Timestamps and temperatures live in two preallocated array('d') buffers, so a
+    full store costs 16 bytes per reading. When the store is full the oldest
+    reading is overwritten and counted in dropped.
+    """
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.timestamps = array.array('d', bytes(8 * capacity))
+        self.temperatures = array.array('d', bytes(8 * capacity))
+        self.start = 0
+        self.count = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp, temperature):
+        """Store a reading, overwriting the oldest one when the buffer is full."""
+        if self.count == self.capacity:
+            self.start = (self.start + 1) % self.capacity
+            self.count -= 1
+            self.dropped += 1
+        slot = (self.start + self.count) % self.capacity
+        self.timestamps[slot] = timestamp
+        self.temperatures[slot] = temperature
+        self.count += 1
+
+    def popleft(self):
+        """Remove and return the oldest reading as (timestamp, temperature)."""
+        if not self.count:
+            raise IndexError("pop from empty measurement store")
+        reading = (self.timestamps[self.start], self.temperatures[self.start])
+        self.start = (self.start + 1) % self.capacity
+        self.count -= 1
+        return reading
+
+    def clear(self):
+        self.start = 0
+        self.count = 0
+
+
 class HealthThermometerService(dbus.service.Object):
-    def __init__(self, bus, index, mainloop):
+    def __init__(self, bus, index, mainloop, acquire_notify=False,
+                 store_capacity=256, measurement_interval=5, stress_mode=False,
+                 fahrenheit=False, include_timestamp=False, include_type=False,
+                 temperature_provider=None, intermediate_provider=None):
         self.path = constants.service_path + f"_ht_service{index}"
         self.bus = bus
         self.uuid = constants.ht_uuid
         self.primary = True
         self.mainloop = mainloop
+        self.store = MeasurementStore(store_capacity)
+        self.temperature_provider = make_sample_provider(
+            temperature_provider, RandomProvider(35.0, 39.0, decimals=2))
+        self.intermediate_provider = make_sample_provider(
+            intermediate_provider, RandomProvider(35.0, 39.0, decimals=2))
+        self.flush_id = None
+        # In stress mode the Measurement Interval is read as milliseconds
+        # instead of seconds, allowing sub-second sample rates.
+        self.stress_mode = stress_mode
 
         dbus.service.Object.__init__(self, bus, self.path)
 
         self.char_temp_msrmt = TemperatureMeasurementCharacteristic(bus, 0, self, mainloop)
         self.char_int_temp = IntermediateTemperatureCharacteristic(bus, 1, self, mainloop)
+        self.char_int_temp.acquire_notify = acquire_notify
         self.char_temp_type = TemperatureTypeCharacteristic(bus, 2, self)
         self.char_interval = MeasurementIntervalCharacteristic(bus, 3, self)
 
+        self.encoder = TemperatureMeasurementEncoder(
+            fahrenheit=fahrenheit,
+            timestamp=include_timestamp,
+            temperature_type=self.char_temp_type.value if include_type else None)
+
         self.characteristics = [
             self.char_temp_msrmt,
             self.char_int_temp,
@@ -548,6 +753,60 @@ class HealthThermometerService(dbus.service.Object):
             self.char_interval,
         ]
 
+        # Measurements are taken whether or not a collector is subscribed;
+        # readings taken while nobody listens are stored and replayed later.
+        self.set_measurement_interval(measurement_interval)
+
+    def set_measurement_interval(self, interval):
+        """Apply a Measurement Interval to the measurement and intermediate temperature timers.
+
+        Args:
+            interval: Interval in seconds (milliseconds in stress mode); 0 stops periodic measurements.
+        """
+        self.char_interval.interval = interval
+        period_ms = interval if self.stress_mode else interval * 1000
+        if not period_ms:
+            notification_scheduler.unsubscribe(self)
+            log.info("Periodic temperature measurements stopped")
+            return
+        if notification_scheduler.is_subscribed(self):
+            notification_scheduler.reschedule(self, period_ms)
+        else:
+            notification_scheduler.subscribe(self, period_ms, self.take_measurement)
+        self.char_int_temp.set_period(max(1, period_ms // 2))
+        log.info(f"Temperature measurement period set to {period_ms} ms")
+
+    def take_measurement(self):
+        temperature = self.temperature_provider.next_sample()
+        if self.char_temp_msrmt.notifying and self.flush_id is None:
+            self.char_temp_msrmt.send_indication(temperature)
+        else:
+            self.store.append(time.time(), temperature)
+        return True
+
+    def shutdown(self):
+        """Stop sampling and replay, and close the sample sources."""
+        notification_scheduler.unsubscribe(self)
+        if self.flush_id is not None:
+            GLib.source_remove(self.flush_id)
+            self.flush_id = None
+        self.temperature_provider.close()
+        self.intermediate_provider.close()
+
+    def flush_stored_measurements(self):
+        """Start replaying stored readings, oldest first, one per main loop iteration."""
+        if self.flush_id is None and len(self.store):
+            log.info(f"Replaying {len(self.store)} stored temperature measurements")
+            self.flush_id = GLib.idle_add(self._flush_next)
+
+    def _flush_next(self):
+        if not self.char_temp_msrmt.notifying or not len(self.store):
+            self.flush_id = None
+            return False
+        timestamp, temperature = self.store.popleft()
+        self.char_temp_msrmt.send_indication(temperature, timestamp)
+        return True
+
     def get_path(self):
         return dbus.ObjectPath(self.path)
 
@@ -566,11 +825,62 @@ class HealthThermometerService(dbus.service.Object):
     def get_characteristics(self):
         return self.characteristics
 
-def encode_ieee_11073(temp):
-    exponent = -2
-    mantissa = int(temp * 100)
-
-    return struct.pack("<bI", exponent, mantissa & 0xFFFFFF)[0:4]
+TEMP_FLAG_FAHRENHEIT = 0x01
+TEMP_FLAG_TIMESTAMP = 0x02
+TEMP_FLAG_TYPE = 0x04
+
+
+class TemperatureMeasurementEncoder:
+    """Encodes Temperature Measurement records into one preallocated buffer.
+
+    The flag set (unit, Time Stamp, Temperature Type) is fixed per instance, so
+    each service can advertise a different record layout. encode() writes the
+    record in place and returns a memoryview of it that is valid until the next
+    call; callers copy it into the D-Bus value.
+    """
+    HEADER = struct.Struct("<BI")
+    TIMESTAMP = struct.Struct("<HBBBBB")
+
+    def __init__(self, fahrenheit=False, timestamp=False, temperature_type=None):
+        """Initialize the encoder.
+
+        Args:
+            fahrenheit: Send temperatures in Fahrenheit instead of Celsius.
+            timestamp: Include the Time Stamp field in every record.
+            temperature_type: Temperature Type value to embed, or None to omit it.
+        """
+        self.fahrenheit = fahrenheit
+        self.temperature_type = temperature_type
+        self.flags = ((TEMP_FLAG_FAHRENHEIT if fahrenheit else 0) |
+                      (TEMP_FLAG_TIMESTAMP if timestamp else 0) |
+                      (TEMP_FLAG_TYPE if temperature_type is not None else 0))
+        self.buffer = bytearray(self.HEADER.size + self.TIMESTAMP.size + 1)
+        self.view = memoryview(self.buffer)
+
+    def encode(self, celsius, timestamp=None):
+        """Encode one reading.
+
+        Args:
+            celsius: Temperature in degrees Celsius.
+            timestamp: Epoch time of the reading. Stored readings pass it to force the
+                Time Stamp field; otherwise the current time is used when enabled.
+
+        Returns:
+            memoryview of the encoded record.
+        """
+        flags = self.flags | (TEMP_FLAG_TIMESTAMP if timestamp is not None else 0)
+        value = celsius * 9 / 5 + 32 if self.fahrenheit else celsius
+        self.HEADER.pack_into(self.buffer, 0, flags, float_to_raw(value))
+        offset = self.HEADER.size
+        if flags & TEMP_FLAG_TIMESTAMP:
+            t = time.localtime(time.time() if timestamp is None else timestamp)
+            self.TIMESTAMP.pack_into(self.buffer, offset, t.tm_year, t.tm_mon, t.tm_mday,
+                                     t.tm_hour, t.tm_min, t.tm_sec)
+            offset += self.TIMESTAMP.size
+        if flags & TEMP_FLAG_TYPE:
+            self.buffer[offset] = self.temperature_type
+            offset += 1
+        return self.view[:offset]
 
 class HTDescriptor(dbus.service.Object):
     def __init__(self, bus, index, characteristic, text):
@@ -579,7 +889,8 @@ class HTDescriptor(dbus.service.Object):
         self.characteristic = characteristic
         self.uuid = constants.desc_uuid
         self.flags = ['read']
-        self.text = text.encode()
+        self.text = text
+        self.value = to_byte_array(text.encode())
 
         dbus.service.Object.__init__(self, bus, self.path)
 
@@ -598,7 +909,7 @@ class HTDescriptor(dbus.service.Object):
     @dbus.service.method(constants.gatt_descriptor_interface,
                          in_signature='a{sv}', out_signature='ay')
     def ReadValue(self, options):
-        return [dbus.Byte(b) for b in self.text]
+        return self.value
 
 
 class TemperatureMeasurementCharacteristic(dbus.service.Object):
@@ -632,10 +943,8 @@ class TemperatureMeasurementCharacteristic(dbus.service.Object):
     @dbus.service.method(constants.gatt_characteristic_interface,
                          in_signature='a{sv}', out_signature='ay')
     def ReadValue(self, options):
-        temp = round(random.uniform(35.0, 39.0), 2)
-        flags = 0x00
-        encoded = encode_ieee_11073(temp)
-        return [dbus.Byte(b) for b in bytes([flags]) + encoded]
+        temp = self.service.temperature_provider.next_sample()
+        return to_byte_array(self.service.encoder.encode(temp))
 
     @dbus.service.method(constants.gatt_characteristic_interface,
                          in_signature='', out_signature='')
@@ -645,7 +954,7 @@ class TemperatureMeasurementCharacteristic(dbus.service.Object):
 
         self.notifying = True
         log.info("Temp Measurement Indications Started")
-        GLib.timeout_add(3000, self.send_indication)
+        self.service.flush_stored_measurements()
 
     @dbus.service.method(constants.gatt_characteristic_interface,
                          in_signature='', out_signature='')
@@ -653,14 +962,10 @@ class TemperatureMeasurementCharacteristic(dbus.service.Object):
         self.notifying = False
         log.info("Temp Measurement Indications Stopped")
 
-    def send_indication(self):
-        if not self.notifying:
-            return False
-
-        value = self.ReadValue({})
+    def send_indication(self, temp, timestamp=None):
+        value = to_byte_array(self.service.encoder.encode(temp, timestamp))
         self.PropertiesChanged(constants.gatt_characteristic_interface,
                                {"Value": value}, [])
-        return True
 
     @dbus.service.signal("org.freedesktop.DBus.Properties",
                          signature="sa{sv}as")
@@ -668,7 +973,7 @@ class TemperatureMeasurementCharacteristic(dbus.service.Object):
         pass
 
 
-class IntermediateTemperatureCharacteristic(dbus.service.Object):
+class IntermediateTemperatureCharacteristic(AcquirableCharacteristic):
     def __init__(self, bus, index, service, mainloop):
         self.path = service.get_path() + f"/char{index}"
 
@@ -679,6 +984,7 @@ class IntermediateTemperatureCharacteristic(dbus.service.Object):
         self.uuid = constants.int_temp_uuid
         self.flags = ['notify']
         self.notifying = False
+        self.period_ms = 2000
 
         dbus.service.Object.__init__(self, bus, self.path)
 
@@ -693,17 +999,16 @@ class IntermediateTemperatureCharacteristic(dbus.service.Object):
                 "UUID": self.uuid,
                 "Service": self.service.get_path(),
                 "Flags": dbus.Array(self.flags, signature='s'),
-                "Descriptors": dbus.Array([self.descriptor.get_path()], signature='o')
+                "Descriptors": dbus.Array([self.descriptor.get_path()], signature='o'),
+                **self.acquired_properties()
             }
         }
 
     @dbus.service.method(constants.gatt_characteristic_interface,
                          in_signature='a{sv}', out_signature='ay')
     def ReadValue(self, options):
-        temp = round(random.uniform(35.0, 39.0), 2)
-        flags = 0x00
-        encoded = encode_ieee_11073(temp)
-        return [dbus.Byte(b) for b in bytes([flags]) + encoded]
+        temp = self.service.intermediate_provider.next_sample()
+        return to_byte_array(self.service.encoder.encode(temp))
 
     @dbus.service.method(constants.gatt_characteristic_interface,
                          in_signature='', out_signature='')
@@ -713,21 +1018,25 @@ class IntermediateTemperatureCharacteristic(dbus.service.Object):
 
         self.notifying = True
         log.info("Intermediate Temp Notifications Started")
-        GLib.timeout_add(2000, self.send_notification)
+        notification_scheduler.subscribe(self, self.period_ms, self.send_notification)
 
     @dbus.service.method(constants.gatt_characteristic_interface,
                          in_signature='', out_signature='')
     def StopNotify(self):
         self.notifying = False
+        notification_scheduler.unsubscribe(self)
         log.info("Intermediate Temp Notifications Stopped")
 
+    def set_period(self, period_ms):
+        """Change the notification period, rescheduling a running subscription."""
+        self.period_ms = period_ms
+        notification_scheduler.reschedule(self, period_ms)
+
     def send_notification(self):
         if not self.notifying:
             return False
 
-        value = self.ReadValue({})
-        self.PropertiesChanged(constants.gatt_characteristic_interface,
-                               {"Value": value}, [])
+        self.send_value(self.ReadValue({}))
         return True
 
     @dbus.service.signal("org.freedesktop.DBus.Properties",
@@ -766,7 +1075,7 @@ class TemperatureTypeCharacteristic(dbus.service.Object):
     @dbus.service.method(constants.gatt_characteristic_interface,
                          in_signature='a{sv}', out_signature='ay')
     def ReadValue(self, options):
-        return [dbus.Byte(self.value)]
+        return to_byte_array([self.value])
 
 
 class MeasurementIntervalCharacteristic(dbus.service.Object):
@@ -800,9 +1109,7 @@ class MeasurementIntervalCharacteristic(dbus.service.Object):
     @dbus.service.method(constants.gatt_characteristic_interface,
                          in_signature='a{sv}', out_signature='ay')
     def ReadValue(self, options):
-        lo = self.interval & 0xFF
-        hi = (self.interval >> 8) & 0xFF
-        return [dbus.Byte(lo), dbus.Byte(hi)]
+        return to_byte_array(struct.pack("<H", self.interval & 0xFFFF))
 
     @dbus.service.method(constants.gatt_characteristic_interface,
                          in_signature='aya{sv}', out_signature='')
@@ -811,6 +1118,363 @@ class MeasurementIntervalCharacteristic(dbus.service.Object):
             log.error("Invalid interval size")
             return
 
-        self.interval = value[0] | (value[1] << 8)
-        log.info(f"Measurement Interval Updated: {self.interval}s")
+        interval = value[0] | (value[1] << 8)
+        unit = "ms" if self.service.stress_mode else "s"
+        log.info(f"Measurement Interval Updated: {interval}{unit}")
+        self.service.set_measurement_interval(interval)
+
+# Declarative GATT service engine
+
+def _to_bytes(value):
+    """Convert a spec value (int, list of ints, str or bytes) to bytes."""
+    if value is None:
+        return b""
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    if isinstance(value, str):
+        return value.encode()
+    if isinstance(value, int):
+        return bytes([value & 0xFF])
+    return bytes(int(b) & 0xFF for b in value)
+
+
+def _random_provider(spec):
+    low = spec.get("min", 0)
+    high = spec.get("max", 255)
+    return lambda: bytes([random.randint(low, high) & 0xFF])
+
+
+def _counter_provider(spec):
+    state = {"value": spec.get("start", 0)}
+    size = spec.get("size", 1)
+
+    def next_value():
+        value = state["value"]
+        state["value"] = (value + 1) % (1 << (8 * size))
+        return value.to_bytes(size, "little")
+    return next_value
+
+
+def _constant_provider(spec):
+    value = _to_bytes(spec.get("value"))
+    return lambda: value
+
+
+def _recorded_provider(spec):
+    options = {key: value for key, value in spec.items() if key not in ("type", "size")}
+    provider = make_sample_provider(dict(options, type="file"), None)
+    size = spec.get("size", 1)
+    mask = (1 << (8 * size)) - 1
+
+    def read():
+        return (int(round(provider.next_sample())) & mask).to_bytes(size, "little")
+    # Lets GattService.shutdown release the file and its memory map.
+    read.close = provider.close
+    return read
+
+
+# Maps the "type" of a provider spec to the factory building its callable.
+VALUE_PROVIDERS = {
+    "random": _random_provider,
+    "counter": _counter_provider,
+    "constant": _constant_provider,
+    "recorded": _recorded_provider,
+}
+
+
+def make_value_provider(spec):
+    """Build a zero-argument callable returning the characteristic value as bytes.
+
+    Args:
+        spec: A callable, a provider dict ({"type": "random", "min": 0, "max": 100}),
+            or a constant value (int, list of ints, str or bytes).
+    """
+    if callable(spec):
+        def read():
+            return _to_bytes(spec())
+        if hasattr(spec, "close"):
+            read.close = spec.close
+        return read
+    if isinstance(spec, dict):
+        factory = VALUE_PROVIDERS.get(spec.get("type"))
+        if factory is None:
+            raise ValueError(f"Unknown value provider type: {spec.get('type')}")
+        return factory(spec)
+    return _constant_provider({"value": spec})
+
+
+def load_service_spec(source):
+    """Load a GATT service spec from a dict, a JSON file or a YAML file.
+
+    Args:
+        source: Spec dictionary or path to a .json/.yaml/.yml file.
+
+    Returns:
+        The spec dictionary.
+    """
+    if isinstance(source, dict):
+        return source
+    with open(source) as spec_file:
+        if source.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise RuntimeError("PyYAML is required to load YAML GATT specs")
+            return yaml.safe_load(spec_file)
+        return json.load(spec_file)
+
+
+class GattService(dbus.service.Object):
+    """Generic GATT service whose characteristics come from a declarative spec."""
+
+    def __init__(self, bus, index, uuid, primary=True):
+        self.path = constants.service_path + f"_service{index}"
+        self.bus = bus
+        self.uuid = uuid
+        self.primary = primary
+        self.characteristics = []
+        dbus.service.Object.__init__(self, bus, self.path)
+
+    def get_path(self):
+        return dbus.ObjectPath(self.path)
+
+    def get_properties(self):
+        return {
+            constants.gatt_service_interface: {
+                'UUID': self.uuid,
+                'Primary': dbus.Boolean(self.primary),
+                'Characteristics': dbus.Array(
+                    [char.get_path() for char in self.characteristics],
+                    signature='o'
+                )
+            }
+        }
+
+    def get_characteristics(self):
+        return self.characteristics
+
+    def shutdown(self):
+        """Close value providers that hold resources, such as recorded files."""
+        for char in self.characteristics:
+            close = getattr(char.value_provider, "close", None)
+            if close is not None:
+                close()
+                char.value_provider = None
+
+
+class GattCharacteristic(AcquirableCharacteristic):
+    """Generic GATT characteristic driven by a value provider and an optional notify rate."""
+
+    def __init__(self, bus, index, service, uuid, flags, value_provider=None, notify_ms=None, on_write=None):
+        self.path = service.get_path() + f"/char{index}"
+        self.bus = bus
+        self.service = service
+        self.uuid = uuid
+        self.flags = list(flags)
+        self.value_provider = value_provider
+        self.notify_ms = notify_ms
+        self.on_write = on_write
+        self.value = b""
+        self.notifying = False
+        self.descriptors = []
+        dbus.service.Object.__init__(self, bus, self.path)
+
+    def get_path(self):
+        return dbus.ObjectPath(self.path)
+
+    def get_properties(self):
+        properties = {
+            'UUID': self.uuid,
+            'Service': self.service.get_path(),
+            'Flags': dbus.Array(self.flags, signature='s'),
+        }
+        if self.descriptors:
+            properties['Descriptors'] = dbus.Array([desc.get_path() for desc in self.descriptors], signature='o')
+        properties.update(self.acquired_properties())
+        return {constants.gatt_characteristic_interface: properties}
+
+    def get_descriptors(self):
+        return self.descriptors
+
+    def current_value(self):
+        if self.value_provider is not None:
+            self.value = self.value_provider()
+        return self.value
+
+    @dbus.service.method(constants.gatt_characteristic_interface, in_signature='a{sv}', out_signature='ay')
+    def ReadValue(self, options):
+        return to_byte_array(self.current_value())
+
+    @dbus.service.method(constants.gatt_characteristic_interface, in_signature='aya{sv}', out_signature='')
+    def WriteValue(self, value, options):
+        self.value = bytes(value)
+        log.debug(f"[{self.uuid}] WriteValue {list(self.value)}")
+        if self.on_write:
+            self.on_write(self, self.value)
+
+    @dbus.service.method(constants.gatt_characteristic_interface, in_signature='', out_signature='')
+    def StartNotify(self):
+        if self.notifying:
+            return
+        self.notifying = True
+        log.info(f"[{self.uuid}] Notifications started")
+        if self.notify_ms:
+            notification_scheduler.subscribe(self, self.notify_ms, self.send_notification)
+
+    @dbus.service.method(constants.gatt_characteristic_interface, in_signature='', out_signature='')
+    def StopNotify(self):
+        self.notifying = False
+        notification_scheduler.unsubscribe(self)
+        log.info(f"[{self.uuid}] Notifications stopped")
+
+    def send_notification(self):
+        if not self.notifying:
+            return False
+        self.send_value(self.current_value())
+        return True
+
+    @dbus.service.signal(dbus_interface='org.freedesktop.DBus.Properties', signature='sa{sv}as')
+    def PropertiesChanged(self, interface, changed, invalidated):
+        pass
+
+
+class GattDescriptor(dbus.service.Object):
+    """Generic GATT descriptor holding a constant (or writable) value."""
+
+    def __init__(self, bus, index, characteristic, uuid, flags, value=b""):
+        self.path = characteristic.get_path() + f"/desc{index}"
+        self.bus = bus
+        self.characteristic = characteristic
+        self.uuid = uuid
+        self.flags = list(flags)
+        self.value = to_byte_array(_to_bytes(value))
+        dbus.service.Object.__init__(self, bus, self.path)
 
+    def get_path(self):
+        return dbus.ObjectPath(self.path)
+
+    def get_properties(self):
+        return {
+            constants.gatt_descriptor_interface: {
+                'UUID': self.uuid,
+                'Characteristic': self.characteristic.get_path(),
+                'Flags': dbus.Array(self.flags, signature='s'),
+            }
+        }
+
+    @dbus.service.method(constants.gatt_descriptor_interface, in_signature='a{sv}', out_signature='ay')
+    def ReadValue(self, options):
+        return self.value
+
+    @dbus.service.method(constants.gatt_descriptor_interface, in_signature='aya{sv}', out_signature='')
+    def WriteValue(self, value, options):
+        self.value = to_byte_array(value)
+
+
+def build_service(bus, index, spec):
+    """Build a GATT service tree from a declarative spec.
+
+    Spec layout (acquire_notify/acquire_write are optional, see AcquirableCharacteristic)::
+
+        {"uuid": "180F", "primary": True, "characteristics": [
+            {"uuid": "2A19", "flags": ["read", "notify"], "notify_ms": 3000, "acquire_notify": True,
+             "value": {"type": "random", "min": 5, "max": 100},
+             "descriptors": [{"uuid": "2901", "flags": ["read"], "value": "Battery Level"}]}]}
+
+    Args:
+        bus: D-Bus connection to export the objects on.
+        index: Service index used to build a unique object path.
+        spec: Spec dictionary, or path to a JSON/YAML file holding one.
+
+    Returns:
+        GattService with all characteristics and descriptors exported.
+    """
+    spec = load_service_spec(spec)
+    service = GattService(bus, index, spec["uuid"], spec.get("primary", True))
+    for char_index, char_spec in enumerate(spec.get("characteristics", [])):
+        provider = None
+        if "value" in char_spec:
+            provider = make_value_provider(char_spec["value"])
+        characteristic = GattCharacteristic(
+            bus, char_index, service, char_spec["uuid"], char_spec.get("flags", ["read"]),
+            value_provider=provider, notify_ms=char_spec.get("notify_ms"), on_write=char_spec.get("on_write"))
+        characteristic.acquire_notify = char_spec.get("acquire_notify", False)
+        characteristic.acquire_write = char_spec.get("acquire_write", False)
+        for desc_index, desc_spec in enumerate(char_spec.get("descriptors", [])):
+            characteristic.descriptors.append(GattDescriptor(
+                bus, desc_index, characteristic, desc_spec["uuid"], desc_spec.get("flags", ["read"]),
+                desc_spec.get("value")))
+        service.characteristics.append(characteristic)
+    return service
+
+
+def _scan_interval_window_written(characteristic, value):
+    """Store the scan interval and window a client writes (two little-endian uint16)."""
+    if len(value) != 4:
+        log.error("[SPS] Invalid Scan Interval Window size")
+        return
+    interval = value[0] | (value[1] << 8)
+    window = value[2] | (value[3] << 8)
+    characteristic.service.scan_interval = interval
+    characteristic.service.scan_window = window
+    log.info(f"Scan Interval Window updated by client: interval={interval} window={window}")
+
+
+def battery_service_spec(acquire_notify=False, level_provider=None):
+    """Return the spec of the Battery Service (0x180F).
+
+    Args:
+        acquire_notify: Offer AcquireNotify on Battery Level.
+        level_provider: Sample provider, or provider spec, for the battery level
+            (see value_providers.make_sample_provider); random 5-100% by default.
+    """
+    provider = make_sample_provider(level_provider, RandomProvider(5, 100))
+
+    def read_level():
+        return bytes([min(100, max(0, int(round(provider.next_sample()))))])
+    read_level.close = provider.close
+    cccd = {"uuid": constants.client_characteristic_config_uuid, "flags": ["read", "write"], "value": CCCD_DISABLED_VALUE}
+    return {"uuid": constants.battery_service_uuid, "characteristics": [
+        {"uuid": constants.battery_level_uuid, "flags": ["read", "notify"], "notify_ms": 3000,
+         "acquire_notify": acquire_notify, "value": read_level, "descriptors": [cccd]},
+        # Battery Level Status: 1=Good, 2=Low, 3=Critical.
+        {"uuid": constants.battery_level_status_uuid, "flags": ["read", "notify"], "notify_ms": 5000,
+         "value": {"type": "random", "min": 1, "max": 3}, "descriptors": [dict(cccd)]},
+    ]}
+
+
+def scan_parameters_service_spec():
+    """Return the spec of the Scan Parameters Service (custom UUIDs, see constants)."""
+    return {"uuid": constants.scan_parameters_service_uuid, "characteristics": [
+        {"uuid": constants.scan_interval_window_uuid, "flags": ["write-without-response"],
+         "on_write": _scan_interval_window_written},
+        # Scan Refresh: 0x00 asks the client to write its scan parameters again.
+        {"uuid": constants.scan_refresh_uuid, "flags": ["notify"], "notify_ms": 10000,
+         "value": SCAN_REFRESH_REQUIRED_VALUE,
+         "descriptors": [{"uuid": constants.client_characteristic_config_uuid, "flags": ["read", "write"],
+                          "value": CCCD_DISABLED_VALUE}]},
+    ]}
+
+
+def generate_synthetic_spec(num_characteristics, notify_ms=None, uuid_base="12345678-1234-5678-1234-"):
+    """Generate a large synthetic service spec for scale tests.
+
+    Args:
+        num_characteristics: Number of characteristics to generate.
+        notify_ms: Notify period applied to every characteristic, or None for read-only ones.
+        uuid_base: First 24 characters of the 128-bit UUIDs; the rest is a running counter.
+
+    Returns:
+        Spec dictionary accepted by build_service.
+    """
+    flags = ["read", "notify"] if notify_ms else ["read"]
+    return {
+        "uuid": f"{uuid_base}{0:012x}",
+        "characteristics": [
+            {
+                "uuid": f"{uuid_base}{index + 1:012x}",
+                "flags": flags,
+                "notify_ms": notify_ms,
+                "value": {"type": "counter", "start": index % 256},
+            }
+            for index in range(num_characteristics)
+        ],
+    }
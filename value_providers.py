@@ -0,0 +1,173 @@
+"""Sample sources for the simulated GATT characteristics.
+
+A provider returns one numeric sample per next_sample() call. RandomProvider
+reproduces the old random.uniform/random.randint behaviour; RecordedFileProvider
+streams a recorded binary or CSV file through a memory map, so arbitrarily long
+recordings are replayed without loading them into memory.
+"""
+import mmap
+import os
+import random
+import struct
+
+
+class RandomProvider:
+    """Uniformly distributed random samples."""
+
+    def __init__(self, low, high, decimals=None):
+        """Initialize the provider.
+
+        Args:
+            low: Lowest sample value.
+            high: Highest sample value.
+            decimals: Round float samples to this many decimals; None draws integers.
+        """
+        self.low = low
+        self.high = high
+        self.decimals = decimals
+
+    def next_sample(self):
+        if self.decimals is None:
+            return random.randint(self.low, self.high)
+        return round(random.uniform(self.low, self.high), self.decimals)
+
+    def close(self):
+        pass
+
+
+class RecordedFileProvider:
+    """Replays samples from a recorded file through a read-only memory map.
+
+    Binary recordings are packed little-endian float32 samples. CSV recordings
+    hold one row per sample; rows whose selected column is not a number (such as
+    a header) are skipped. Each next_sample() call advances by rate_scale samples,
+    so 2.0 replays twice as fast and 0.5 repeats every sample twice. At the end of
+    the file the provider starts over when loop is set, otherwise it keeps
+    returning the last sample.
+    """
+    FLOAT32 = struct.Struct("<f")
+
+    def __init__(self, path, file_format=None, loop=True, rate_scale=1.0, column=0):
+        """Open and map a recording.
+
+        Args:
+            path: Path of the recorded file.
+            file_format: "binary" or "csv"; guessed from the extension when None.
+            loop: Restart from the first sample at the end of the file.
+            rate_scale: Samples consumed per call; must be positive.
+            column: Zero-based CSV column holding the samples.
+
+        Raises:
+            ValueError: If the file is empty, the format is unknown or rate_scale is not positive.
+        """
+        if rate_scale <= 0:
+            raise ValueError(f"rate_scale must be positive, got {rate_scale}")
+        if file_format is None:
+            file_format = "csv" if path.lower().endswith((".csv", ".txt")) else "binary"
+        if file_format not in ("binary", "csv"):
+            raise ValueError(f"Unknown recording format: {file_format}")
+        if os.path.getsize(path) == 0:
+            raise ValueError(f"Recording is empty: {path}")
+        self.path = path
+        self.file_format = file_format
+        self.loop = loop
+        self.rate_scale = rate_scale
+        self.column = column
+        self.exhausted = False
+        self.last_sample = None
+        self.pending = 0.0
+        self.position = 0
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if file_format == "binary":
+            self.count = len(self.map) // self.FLOAT32.size
+            if not self.count:
+                self.close()
+                raise ValueError(f"Recording holds no float32 samples: {path}")
+
+    def next_sample(self):
+        """Return the next sample, honouring rate_scale, loop and end of file."""
+        self.pending += self.rate_scale
+        while self.pending >= 1.0 or self.last_sample is None:
+            self.pending = max(0.0, self.pending - 1.0)
+            sample = self._read_next()
+            if sample is None:
+                break
+            self.last_sample = sample
+        return self.last_sample
+
+    def _read_next(self):
+        if self.exhausted:
+            return None
+        wrapped = False
+        while True:
+            sample = self._read_binary() if self.file_format == "binary" else self._read_csv()
+            if sample is not None:
+                return sample
+            if not self.loop or wrapped:
+                # Either replay is one-shot or the whole file held no sample.
+                self.exhausted = True
+                if self.last_sample is None:
+                    raise ValueError(f"Recording holds no samples: {self.path}")
+                return None
+            self.position = 0
+            wrapped = True
+
+    def _read_binary(self):
+        if self.position >= self.count:
+            return None
+        sample = self.FLOAT32.unpack_from(self.map, self.position * self.FLOAT32.size)[0]
+        self.position += 1
+        return sample
+
+    def _read_csv(self):
+        size = len(self.map)
+        while self.position < size:
+            end = self.map.find(b"\n", self.position)
+            if end == -1:
+                end = size
+            row = self.map[self.position:end]
+            self.position = end + 1
+            fields = row.split(b",")
+            if len(fields) <= self.column:
+                continue
+            try:
+                return float(fields[self.column])
+            except ValueError:
+                continue
+        return None
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def make_sample_provider(spec, default):
+    """Build a provider from a service option.
+
+    Args:
+        spec: None (use default), an object with next_sample(), a recording path,
+            or a dict such as {"type": "file", "path": "temps.csv", "rate_scale": 2}
+            or {"type": "random", "min": 35.0, "max": 39.0, "decimals": 2}.
+        default: Provider returned when spec is None.
+
+    Returns:
+        An object with next_sample() and close().
+    """
+    if spec is None:
+        return default
+    if hasattr(spec, "next_sample"):
+        return spec
+    if isinstance(spec, str):
+        return RecordedFileProvider(spec)
+    options = dict(spec)
+    provider_type = options.pop("type", "file")
+    if provider_type == "file":
+        return RecordedFileProvider(options.pop("path"), file_format=options.pop("format", None), **options)
+    if provider_type == "random":
+        return RandomProvider(options.get("min", 0), options.get("max", 100), options.get("decimals"))
+    raise ValueError(f"Unknown sample provider type: {provider_type}")